@@ -0,0 +1,100 @@
+import time
+
+from metrics import metrics
+
+DEFAULT_WINDOW_SECONDS = 30  # how long a cluster stays open for more hits
+GROUP_FIELDS = ("underlier", "otype", "expiry")
+
+
+def _group_key(hit, group_by):
+    key = [hit.underlying_symbol]
+    if "otype" in group_by:
+        key.append(hit.is_call)
+    if "expiry" in group_by:
+        key.append(hit.exp)
+    return tuple(key)
+
+
+# Hits on one underlier (and optionally option type and expiry) that arrived
+# within one aggregation window, e.g. the legs of a sweep across strikes. Sums
+# are kept as hits are added so a cluster is never rescanned.
+class HitCluster:
+    __slots__ = ('key', 'underlying_symbol', 'opened_at', 'hits', 'total_premium', 'ovol', 'calls', 'hq_hits',
+                 'max_anomaly_score')
+
+    def __init__(self, key, underlying_symbol, opened_at):
+        self.key = key
+        self.underlying_symbol = underlying_symbol
+        self.opened_at = opened_at
+        self.hits = []
+        self.total_premium = 0.0
+        self.ovol = 0
+        self.calls = 0
+        self.hq_hits = 0
+        self.max_anomaly_score = 0.0
+
+    def add(self, hit):
+        self.hits.append(hit)
+        self.total_premium += hit.total_premium
+        self.ovol += hit.ovol
+        self.calls += hit.is_call
+        self.hq_hits += hit.hq_hit
+        self.max_anomaly_score = max(self.max_anomaly_score, hit.anomaly_score)
+
+    @property
+    def puts(self):
+        return len(self.hits) - self.calls
+
+    @property
+    def strikes(self):
+        return sorted({hit.strike for hit in self.hits})
+
+    @property
+    def expirations(self):
+        return sorted({hit.exp for hit in self.hits})
+
+
+# Groups hits into HitClusters keyed by underlier, plus option type ("otype")
+# and days to expiry ("expiry") when listed in group_by. A cluster opens with
+# its first hit and is flushed window_seconds later with every hit that joined
+# it meanwhile, so each poll's hits are grouped with one dict lookup apiece.
+# With a window of 0, every cluster is flushed as soon as it is added, so the
+# hits of one poll are grouped together without waiting for later polls.
+class HitAggregator:
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS, group_by=("underlier",), clock=time.monotonic):
+        unknown = set(group_by) - set(GROUP_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown aggregation fields {', '.join(sorted(unknown))}, expected some of {', '.join(GROUP_FIELDS)}.")
+        self.window_seconds = window_seconds
+        self.group_by = group_by
+        self.clock = clock
+        self.clusters = {}  # group key -> open HitCluster, oldest first
+
+    def __len__(self):
+        return len(self.clusters)
+
+    def add(self, hits):
+        now = self.clock()
+        clusters = self.clusters
+        for hit in hits:
+            key = _group_key(hit, self.group_by)
+            cluster = clusters.get(key)
+            if cluster is None:
+                cluster = clusters[key] = HitCluster(key, hit.underlying_symbol, now)
+            cluster.add(hit)
+
+    # Returns the clusters whose window has closed, or every open cluster with
+    # force, and stops tracking them.
+    def flush(self, force=False):
+        deadline = self.clock() - self.window_seconds
+        flushed = []
+        # Clusters are inserted in the order they opened, so the expired ones
+        # come first.
+        for key, cluster in self.clusters.items():
+            if not force and cluster.opened_at > deadline:
+                break
+            flushed.append(cluster)
+        for cluster in flushed:
+            del self.clusters[cluster.key]
+            metrics.inc("screener_hit_clusters_total", size="single" if len(cluster.hits) == 1 else "multiple")
+        return flushed
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from diffing import ResponseFingerprint
+from http_client import DEFAULT_TIMEOUT, ScreenerClient, make_session
+from metrics import metrics
+from scheduler import PollScheduler
+from sessions import SessionManager
+from streaming import loads
+
+
+# Returns a short name for a screen, for log output.
+def screen_name(parsed_curl_dict, index):
+    screen_id = parsed_curl_dict["query_params"].get("screenid")
+    return f"screen {screen_id}" if screen_id else f"screen #{index}"
+
+
+# Polls one screen on the ticks of scheduler (a PollScheduler) until it needs
+# re-authentication. Failed fetches, error statuses, invalid responses and
+# exceptions raised while processing a poll only skip that poll; client
+# retries and backs off as described in ScreenerClient.
+# Each decoded response is handed to process_data(name, data) on the shared
+# pipeline executor, so the hit pipeline and its dedup state only ever
+# run on one thread. process_data returns the hits it found, which the
+# scheduler uses to adapt the polling interval. on_tick, if given, runs on the
+# pipeline executor before every poll, between the previous poll's processing
+# and the next. fingerprint is the screen's ResponseFingerprint, a new one if
+# not given.
+async def poll_screen(name, client, scheduler, fetch_executor, pipeline_executor, process_data, on_auth_required, recorder=None, on_tick=None,
+                      fingerprint=None):
+    loop = asyncio.get_running_loop()
+    if fingerprint is None:
+        fingerprint = ResponseFingerprint()
+
+    while True:
+        await scheduler.wait_async()
+        try:
+            if on_tick is not None:
+                await loop.run_in_executor(pipeline_executor, on_tick)
+            fetched_at = time.time()
+            response = await loop.run_in_executor(fetch_executor, client.fetch)
+            print(f"{name}: {client.stats.summary()}")
+            if response is None:
+                continue
+            if recorder is not None:
+                recorder.record(response.content, fetched_at, response.elapsed.total_seconds(), response.status_code)
+
+            if response.status_code == 401:
+                print(f"{name}: Error: {response.status_code}")
+                await loop.run_in_executor(pipeline_executor, on_auth_required, name)
+                return
+
+            if response.status_code == 304 or (response.status_code == 200 and fingerprint.unchanged(response.content)):
+                print(f"{name}: Screen unchanged since last poll, skipping.")
+                metrics.inc("screener_short_circuited_polls_total")
+                scheduler.record_poll(0)
+                continue
+
+            if response.status_code != 200:
+                print(f"{name}: Error: {response.status_code}")
+                continue
+
+            try:
+                with metrics.time("screener_stage_seconds", stage="decode"):
+                    data = loads(response.content)
+            except json.JSONDecodeError:
+                print(f"{name}: Invalid JSON response")
+                metrics.inc("screener_invalid_responses_total")
+                continue
+
+            hits = await loop.run_in_executor(pipeline_executor, process_data, name, data)
+            scheduler.record_poll(len(hits or ()), data.get("responseTime"))
+        except Exception as e:
+            # One bad response or bug mustn't stop the other screens sharing the loop.
+            print(f"{name}: Error during poll: {e!r}")
+            metrics.inc("screener_poll_errors_total")
+
+
+# Polls every screen concurrently on one event loop until they have all
+# stopped. screens is a list of (parsed_curl_dict, interval_seconds) pairs,
+# with parsed_curl_dict as returned by parse_curl_string_to_dict(). All screens
+# share one connection pool and cookie jar. Raw responses are passed to
+# recorder if one is given. make_scheduler(interval_seconds) returns the
+# scheduler for each screen and make_fingerprint() its ResponseFingerprint,
+# and on_tick is passed to poll_screen(). The shared cookie jar is saved to
+# cookie_jar_path and kept alive every keepalive_seconds, see SessionManager.
+async def run_screens(screens, process_data, on_auth_required, timeout=DEFAULT_TIMEOUT, recorder=None, make_scheduler=PollScheduler, on_tick=None,
+                      cookie_jar_path=None, keepalive_seconds=None, make_fingerprint=ResponseFingerprint):
+    session = make_session(pool_size=len(screens))
+    fetch_executor = ThreadPoolExecutor(max_workers=len(screens), thread_name_prefix="fetch")
+    pipeline_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline")
+
+    tasks = []
+    clients = []
+    for index, (parsed_curl_dict, interval_seconds) in enumerate(screens):
+        client = ScreenerClient(**parsed_curl_dict, timeout=timeout, session=session)
+        clients.append(client)
+        name = screen_name(parsed_curl_dict, index)
+        tasks.append(poll_screen(
+            name, client, make_scheduler(interval_seconds), fetch_executor, pipeline_executor, process_data, on_auth_required, recorder, on_tick,
+            make_fingerprint(),
+        ))
+
+    session_manager = None
+    if cookie_jar_path or keepalive_seconds:
+        session_manager = SessionManager(session, cookie_jar_path, clients[0].keepalive, keepalive_seconds)
+        session_manager.restore()
+        session_manager.start()
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        if session_manager is not None:
+            session_manager.stop()
+        fetch_executor.shutdown()
+        pipeline_executor.shutdown()
+        session.close()
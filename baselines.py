@@ -0,0 +1,171 @@
+import math
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_WINDOW = 30  # volume-rate samples kept per contract and underlier
+DEFAULT_MAX_CONTRACTS = 50_000  # least recently updated contracts are dropped beyond this
+MIN_SAMPLES = 5  # samples needed before a z-score is reported
+MIN_INTERVAL_SECONDS = 1.0  # floor on the time between samples, so rates stay finite
+MAX_ZSCORE = 10.0  # reported for any change against a perfectly flat baseline
+
+UNDERLIER_WEIGHT = 0.5  # weight of the underlier's z-score in the anomaly score
+ACCELERATION_WEIGHT = 1.0  # weight of log2 of the contract's acceleration
+
+
+# Fixed-size ring buffer of floats with a running sum and sum of squares, so
+# pushing a value and reading the mean and standard deviation are O(1).
+class RollingWindow:
+    __slots__ = ('values', 'index', 'count', 'total', 'total_sq')
+
+    def __init__(self, size):
+        self.values = [0.0] * size
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value):
+        if self.count == len(self.values):
+            old = self.values[self.index]
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        self.values[self.index] = value
+        self.total += value
+        self.total_sq += value * value
+        self.index = (self.index + 1) % len(self.values)
+
+    # Returns how many standard deviations value is above the window's mean,
+    # or 0.0 until the window holds MIN_SAMPLES values.
+    def zscore(self, value):
+        if self.count < MIN_SAMPLES:
+            return 0.0
+        mean = self.total / self.count
+        variance = max(self.total_sq / self.count - mean * mean, 0.0)
+        if variance == 0.0:
+            return 0.0 if value == mean else math.copysign(MAX_ZSCORE, value - mean)
+        return (value - mean) / math.sqrt(variance)
+
+
+# One contract's volume history. Samples are volume rates (contracts per
+# minute) between observed changes in cumulative volume, so a contract only
+# needs updating when it trades, and quiet stretches still lower the rate.
+class ContractBaseline:
+    __slots__ = ('rates', 'last_volume', 'last_time', 'last_rate', 'zscore', 'acceleration')
+
+    def __init__(self, window):
+        self.rates = RollingWindow(window)
+        self.last_volume = None
+        self.last_time = None
+        self.last_rate = None
+        self.zscore = 0.0
+        self.acceleration = 1.0
+
+    # Records the contract's cumulative volume at timestamp. Returns the
+    # volume traded since the previous update.
+    def update(self, volume, timestamp):
+        if self.last_volume is None:
+            self.last_volume, self.last_time = volume, timestamp
+            return 0
+        if volume < self.last_volume:
+            self.last_volume = 0  # cumulative volume resets each trading day
+        traded = volume - self.last_volume
+        if traded == 0:
+            return 0
+
+        rate = traded / max(timestamp - self.last_time, MIN_INTERVAL_SECONDS) * 60
+        self.zscore = self.rates.zscore(rate)
+        self.acceleration = rate / self.last_rate if self.last_rate else 1.0
+        self.rates.push(rate)
+        self.last_volume, self.last_time, self.last_rate = volume, timestamp, rate
+        return traded
+
+
+# One underlier's option flow: the volume traded across all its contracts
+# per minute between polls.
+class UnderlierBaseline:
+    __slots__ = ('rates', 'last_time', 'zscore')
+
+    def __init__(self, window):
+        self.rates = RollingWindow(window)
+        self.last_time = None
+        self.zscore = 0.0
+
+    def update(self, traded, timestamp):
+        if self.last_time is not None:
+            rate = traded / max(timestamp - self.last_time, MIN_INTERVAL_SECONDS) * 60
+            self.zscore = self.rates.zscore(rate)
+            self.rates.push(rate)
+        self.last_time = timestamp
+
+
+# Rolling volume baselines for every contract and underlier seen, updated
+# incrementally from each poll's parsed columns. Contracts are keyed by option
+# symbol and bounded by max_contracts, dropping the least recently updated.
+#
+# Each contract's anomaly score combines how unusual its latest volume rate is
+# against its own history (z-score), how unusual its underlier's total option
+# flow is, and how much its rate accelerated since its previous trade.
+class BaselineStore:
+    def __init__(self, window=DEFAULT_WINDOW, max_contracts=DEFAULT_MAX_CONTRACTS, clock=time.time):
+        self.window = window
+        self.max_contracts = max_contracts
+        self.clock = clock
+        self.contracts = OrderedDict()  # option symbol -> ContractBaseline
+        self.underliers = {}  # underlier symbol -> UnderlierBaseline
+
+    def __len__(self):
+        return len(self.contracts)
+
+    # Updates the baselines from screening.flatten_options() output and returns
+    # the volume z-score, acceleration, underlier z-score and anomaly score of
+    # every row, as arrays.
+    def update(self, columns, options, option_underliers):
+        now = self.clock()
+        volumes = columns['ovol'].tolist()
+        trade_times = columns['trade.time'].tolist()
+        contracts = self.contracts
+        traded_by_underlier = {}
+        rows = []
+
+        for option, underlier, volume, trade_time in zip(options, option_underliers, volumes, trade_times):
+            symbol = option['symbol']
+            contract = contracts.get(symbol)
+            if contract is None:
+                contract = contracts[symbol] = ContractBaseline(self.window)
+                if len(contracts) > self.max_contracts:
+                    contracts.popitem(last=False)
+            else:
+                contracts.move_to_end(symbol)
+            # Exchange trade time when there is one, so rates follow the trades.
+            traded = contract.update(volume, trade_time / 1000 if trade_time > 0 else now)
+
+            underlier_symbol = underlier.get('symbol')
+            traded_by_underlier[underlier_symbol] = traded_by_underlier.get(underlier_symbol, 0) + traded
+            rows.append((contract, underlier_symbol))
+
+        for symbol, traded in traded_by_underlier.items():
+            baseline = self.underliers.get(symbol)
+            if baseline is None:
+                baseline = self.underliers[symbol] = UnderlierBaseline(self.window)
+            baseline.update(traded, now)
+
+        zscores = np.array([contract.zscore for contract, _ in rows])
+        accelerations = np.array([contract.acceleration for contract, _ in rows])
+        underlier_zscores = np.array([self.underliers[symbol].zscore for _, symbol in rows])
+        return zscores, accelerations, underlier_zscores, anomaly_scores(zscores, accelerations, underlier_zscores)
+
+
+# Combines the baseline measures into one score per row: only unusually high
+# activity counts, so negative z-scores and deceleration contribute nothing.
+# The underlier's z-score is capped at MAX_ZSCORE, so a burst in one contract
+# doesn't outrank every other contract on the same underlier.
+def anomaly_scores(zscores, accelerations, underlier_zscores):
+    return (
+        np.maximum(zscores, 0)
+        + UNDERLIER_WEIGHT * np.clip(underlier_zscores, 0, MAX_ZSCORE)
+        + ACCELERATION_WEIGHT * np.log2(np.maximum(accelerations, 1))
+    )
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+# Inserts millions of option keys into a DedupStore and reports memory as it
+# goes, to show that memory stays flat once max_keys is reached.
+#
+# Run from the repository root: python -m benchmarks.bench_dedup
+
+import time
+import tracemalloc
+
+from dedup import DedupStore, option_key
+
+TOTAL_KEYS = 3_000_000
+MAX_KEYS = 100_000
+REPORT_EVERY = 500_000
+
+
+def insert_keys(store, now, count, report_every=None):
+    for i in range(count):
+        now[0] += 1
+        key = option_key(f"NWSA--250417C{i:08d}", 0.05, 1744378206672 + i)
+        if key not in store:
+            store.add(key)
+        if report_every and (i + 1) % report_every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            print(f"{i + 1:>10,} keys inserted: {len(store):>7,} stored, {current / 1024 / 1024:6.1f}MB traced")
+
+
+def main():
+    # A fake clock one second apart per key, so the TTL never kicks in and
+    # only the max_keys cap bounds the store.
+    now = [0.0]
+    store = DedupStore(max_keys=MAX_KEYS, ttl_seconds=None, clock=lambda: now[0])
+
+    tracemalloc.start()
+    insert_keys(store, now, TOTAL_KEYS, REPORT_EVERY)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Peak traced memory: {peak / 1024 / 1024:.1f}MB, evicted: {store.evicted:,}")
+
+    # Time a separate run, since tracemalloc slows every allocation down.
+    store = DedupStore(max_keys=MAX_KEYS, ttl_seconds=None, clock=lambda: now[0])
+    start = time.perf_counter()
+    insert_keys(store, now, REPORT_EVERY)
+    elapsed = time.perf_counter() - start
+    print(f"Avg cost per key (hash + lookup + insert): {elapsed / REPORT_EVERY * 1e9:.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
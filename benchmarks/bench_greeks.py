@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+# Times implied volatility and greeks for 100k random options solved at once,
+# against the target of 100k options per second on one core, and the same
+# options enriched as OptionRecords with a cold and a warm cache.
+#
+# Run from the repository root: python -m benchmarks.bench_greeks
+
+import time
+
+import numpy as np
+
+from greeks import GreeksCalculator, delta_gamma, implied_volatility, ndtr, price_and_vega
+from records import OptionRecord
+
+OPTIONS = 100_000
+TARGET_OPTIONS_PER_SECOND = 100_000
+
+
+# Returns random options priced with known volatilities, quoted to the cent.
+def random_options(count, seed=0):
+    rng = np.random.default_rng(seed)
+    spot = rng.uniform(5, 500, count).round(2)
+    strike = (spot * rng.uniform(0.7, 1.3, count)).round(0)
+    days = rng.integers(0, 60, count)
+    volatility = rng.uniform(0.1, 1.5, count)
+    is_call = rng.random(count) < 0.5
+    price, _ = price_and_vega(spot, strike, np.maximum(days, 1) / 365, volatility, is_call)
+    return spot, strike, days, volatility, is_call, np.maximum(price.round(2), 0.01)
+
+
+def build_records(spot, strike, days, is_call, price):
+    return [
+        OptionRecord(
+            symbol=f"SYM{i}", display_symbol=f"SYM{i}", underlying_symbol="SYM", is_call=bool(is_call[i]),
+            trade_price=float(price[i]), trade_time=0, ovol=1, ooi=0, ask=float(price[i]), bid=None,
+            strike=float(strike[i]), exp=int(days[i]), underlying_price=float(spot[i]), underlying_price_text="",
+            total_premium=0.0, otm_percent=0.0, buy_to_open=True, hq_hit=False,
+        )
+        for i in range(len(spot))
+    ]
+
+
+def report(label, count, elapsed):
+    rate = count / elapsed
+    verdict = "meets" if rate >= TARGET_OPTIONS_PER_SECOND else "MISSES"
+    print(f"  {label:<28} {elapsed * 1000:8.1f}ms  {rate:>12,.0f} options/s  ({verdict} the {TARGET_OPTIONS_PER_SECOND:,}/s target)")
+
+
+def main():
+    spot, strike, days, volatility, is_call, price = random_options(OPTIONS)
+    print(f"{OPTIONS:,} options, normal CDF from {'scipy' if ndtr is not None else 'Abramowitz-Stegun'}:")
+
+    start = time.perf_counter()
+    solved = implied_volatility(price, spot, strike, days / 365, is_call)
+    delta_gamma(spot, strike, days / 365, solved, is_call)
+    report("arrays", OPTIONS, time.perf_counter() - start)
+
+    _, vega = price_and_vega(spot, strike, np.maximum(days, 1) / 365, volatility, is_call)
+    priced = ~np.isnan(solved) & (vega > 0.01)
+    print(f"  solved {np.mean(~np.isnan(solved)):.1%}; median error where vega > 0.01: "
+          f"{np.median(np.abs(solved - volatility)[priced]):.5f}")
+
+    records = build_records(spot, strike, days, is_call, price)
+    calculator = GreeksCalculator()
+    start = time.perf_counter()
+    calculator.enrich(records)
+    report("records, cold cache", OPTIONS, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    calculator.enrich(records)
+    report("records, warm cache", OPTIONS, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
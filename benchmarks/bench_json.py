@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+# Compares peak memory and latency of decoding a 1000-option screener response
+# and screening it: json via response.json()-style decoding, orjson, and
+# streaming with ijson. The body is read from a file, standing in for the
+# socket a streamed response reads from. Each decoder is measured screening
+# every option, and through a ScreenDiffer as with INCREMENTAL_SCREENING (the
+# default), on a screen's first poll, when every option is new.
+#
+# Run from the repository root: python -m benchmarks.bench_json
+
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.payloads import OPTIONS_PER_SCREEN, build_large_response
+from rules import Rules, default_rules_config
+from diffing import ScreenDiffer
+from screening import screen_option_list, screen_options
+from streaming import ijson, orjson, stream_screen_data
+
+RULES = Rules.from_config(default_rules_config(1000, 1000, 40))
+
+
+def decode_with_json(path):
+    with open(path, "rb") as f:
+        body = f.read()
+    return json.loads(body.decode("utf-8"))  # what response.json() does
+
+
+def decode_with_orjson(path):
+    with open(path, "rb") as f:
+        body = f.read()
+    return orjson.loads(body)
+
+
+def decode_with_ijson(path):
+    return stream_screen_data(open(path, "rb"))
+
+
+def screen_all(data):
+    return screen_options(data, set(), RULES)
+
+
+def screen_incremental(data):
+    options, option_underliers = ScreenDiffer().diff(data).options_to_screen()
+    return screen_option_list(options, option_underliers, set(), RULES)
+
+
+# Returns the latency, peak traced memory and hit count of one run. Latency is
+# timed on a separate run, since tracemalloc slows every allocation down.
+def measure(decode, screen, path):
+    start = time.perf_counter()
+    hits = screen(decode(path))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    screen(decode(path))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(hits)
+
+
+def main():
+    body = json.dumps(build_large_response()).encode("utf-8")
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        f.write(body)
+        path = f.name
+
+    decoders = [("json (response.json())", decode_with_json)]
+    if orjson is not None:
+        decoders.append(("orjson", decode_with_orjson))
+    if ijson is not None:
+        decoders.append((f"ijson streaming ({ijson.backend})", decode_with_ijson))
+
+    try:
+        for description, screen in [("every option", screen_all), ("incrementally", screen_incremental)]:
+            print(f"Decoding a {len(body) / 1024:.0f}KB response with {OPTIONS_PER_SCREEN} options and screening {description}:")
+            for name, decode in decoders:
+                measure(decode, screen, path)  # warm up
+                elapsed, peak, hits = measure(decode, screen, path)
+                print(f"  {name:<28} {elapsed * 1000:7.1f}ms  peak {peak / 1024:7.0f}KB  ({hits} hits)")
+    finally:
+        os.remove(path)
+
+    if orjson is None or ijson is None:
+        print("Install orjson and ijson to compare all decoders.")
+
+
+if __name__ == "__main__":
+    main()
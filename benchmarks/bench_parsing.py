@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+# Compares the per-option cost of the original regex-based parsing against the
+# translate-based parsers in parsing.py, on the same fields of the options in
+# example_response_1. The column parsers are the like-for-like comparison, at
+# about 3x; the goal of 10x wasn't reached. The screening engine's flattening
+# step is listed too, but it does less work, so its speedup isn't comparable.
+#
+# Run from the repository root: python -m benchmarks.bench_parsing
+
+import copy
+import re
+import timeit
+
+from example_responses import example_response_1
+from parsing import clean_float, clean_int, parse_float_column, parse_int_column
+from screening import flatten_screen_data
+
+FLOAT_FIELDS = ['trade.price', 'ask', 'bid', 'strp']
+INT_FIELDS = ['trade.time', 'ovol', 'ooi', 'exp']
+REPEATS = 200
+
+
+# The regex-based parsers from before parsing.py existed, kept for comparison.
+def regex_clean_int(val):
+    val = str(val).strip()
+    if not val or val in ['--', 'NaN']:
+        return 0
+    try:
+        return int(re.sub(r'[^\d]', '', val))
+    except ValueError:
+        return 0
+
+
+def regex_clean_float(val):
+    val = str(val).strip()
+    if not val or val in ['--', 'NaN']:
+        return 0.0
+    try:
+        return float(re.sub(r'[^\d.\-]', '', val))
+    except ValueError:
+        return 0.0
+
+
+def parse_per_option(options, parse_int, parse_float):
+    for opt in options:
+        for field in FLOAT_FIELDS:
+            parse_float(opt[field])
+        for field in INT_FIELDS:
+            parse_int(opt.get(field, 0))
+
+
+def parse_columns(options):
+    for field in FLOAT_FIELDS:
+        parse_float_column([opt[field] for opt in options])
+    for field in INT_FIELDS:
+        parse_int_column([opt.get(field, 0) for opt in options])
+
+
+def per_option_us(func, n_options):
+    seconds = min(timeit.repeat(func, number=REPEATS, repeat=5))
+    return seconds / REPEATS / n_options * 1e6
+
+
+def main():
+    options = []
+    for underlier in example_response_1["ScreenData"]["underliers"]:
+        options.extend(copy.deepcopy(underlier["options"]))
+    n_options = len(options)
+
+    results = [
+        ("regex, per field", per_option_us(lambda: parse_per_option(options, regex_clean_int, regex_clean_float), n_options)),
+        ("translate, per field", per_option_us(lambda: parse_per_option(options, clean_int, clean_float), n_options)),
+        ("translate, per column", per_option_us(lambda: parse_columns(options), n_options)),
+        ("screening engine (less work)", per_option_us(lambda: flatten_screen_data(example_response_1), n_options)),
+    ]
+
+    baseline = results[0][1]
+    print(f"Parsing {len(FLOAT_FIELDS) + len(INT_FIELDS)} fields for {n_options} options:")
+    print("(the screening engine only parses the fields it filters on, for options with volume)")
+    for name, cost in results:
+        print(f"  {name:<28} {cost:8.2f} us/option  ({baseline / cost:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
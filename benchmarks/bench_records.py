@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# Compares the memory of a 1000-option screen held as cleaned option dicts
+# (what main() used to carry between the filters and the notifier) against
+# the same options as OptionRecords.
+#
+# Run from the repository root: python -m benchmarks.bench_records
+
+import gc
+import tracemalloc
+
+from benchmarks.payloads import OPTIONS_PER_SCREEN, build_large_response
+from parsing import clean_float, clean_int
+from screening import collect_options, derive_columns, flatten_options, make_record
+
+
+# Cleans an option dict in place the way the screener did before OptionRecords,
+# adding the fields its main() and is_high_quality_hit() used to add.
+def clean_option_dict(opt, underlying_price):
+    for field in ['trade.price', 'ask', 'bid', 'strp']:
+        opt[field] = clean_float(opt[field])
+    for field in ['trade.time', 'ovol', 'ooi', 'exp']:
+        opt[field] = clean_int(opt.get(field, 0))
+    opt['total_premium'] = opt['trade.price'] * opt['ovol'] * 100
+    otm_percent = (opt['strp'] - underlying_price) / underlying_price
+    opt['otm_percent'] = f"{otm_percent:.2%}"
+    return opt
+
+
+def build_dicts(data):
+    options = []
+    for underlier in data["ScreenData"]["underliers"]:
+        underlying_price = clean_float(underlier["price"])
+        for opt in underlier["options"]:
+            options.append(clean_option_dict(opt, underlying_price))
+    return options
+
+
+def build_records(data):
+    options, option_underliers = collect_options(data)
+    for opt in options:
+        opt['ovol'] = '1'  # keep every option, not just the ones with volume
+    columns, options, option_underliers = flatten_options(options, option_underliers)
+    derive_columns(columns)
+    hq_mask = columns['buy_to_open']
+    return [make_record(columns, options, option_underliers, hq_mask, i) for i in range(len(options))]
+
+
+# Returns the bytes still alive once the decoded payload is dropped and only
+# build()'s result is kept, including any payload strings the result shares.
+def retained_bytes(build):
+    tracemalloc.start()
+    data = build_large_response()
+    result = build(data)
+    del data
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(result) == OPTIONS_PER_SCREEN
+    return retained
+
+
+def main():
+    dict_bytes = retained_bytes(build_dicts)
+    record_bytes = retained_bytes(build_records)
+    print(f"Memory held by a {OPTIONS_PER_SCREEN}-option screen:")
+    print(f"  option dicts    {dict_bytes / 1024:7.0f}KB  {dict_bytes / OPTIONS_PER_SCREEN:5.0f} bytes/option")
+    print(f"  OptionRecords   {record_bytes / 1024:7.0f}KB  {record_bytes / OPTIONS_PER_SCREEN:5.0f} bytes/option")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Measures the cold-start import cost of each run mode with python -X
+# importtime: the median total over several fresh interpreters, and which
+# modules (and their direct imports) cost the most in the last run.
+#
+# Run from the repository root: python -m benchmarks.bench_startup
+
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+TOP_MODULES = 10
+
+# What each mode imports before it starts polling.
+MODES = {
+    "single": "import options_screener",
+    "concurrent": "import options_screener, asyncio, async_runner",
+    "sharded": "import options_screener, supervisor",
+    "replay": "import replay",
+}
+
+
+# Returns {module: (depth, cumulative microseconds)} from -X importtime output,
+# plus the total of the top-level (depth 0) imports.
+def parse_importtime(stderr):
+    modules = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Names are indented one space past the bar, plus two per level of nesting.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (depth, int(cumulative_us))
+        if depth == 0:
+            total += int(cumulative_us)
+    return modules, total
+
+
+def measure(statement):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    totals = []
+    for _ in range(RUNS):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        modules, total = parse_importtime(result.stderr)
+        totals.append(total)
+    return statistics.median(totals), modules
+
+
+def main():
+    baseline, _ = measure("pass")
+    print(f"interpreter startup imports: {baseline / 1000:.1f}ms (median of {RUNS}, not counted below)")
+    for mode, statement in MODES.items():
+        total, modules = measure(statement)
+        print(f"\n{mode}: {(total - baseline) / 1000:.1f}ms ({statement})")
+        direct = [(name, cumulative_us) for name, (depth, cumulative_us) in modules.items() if depth <= 1]
+        for name, cumulative_us in sorted(direct, key=lambda item: item[1], reverse=True)[:TOP_MODULES]:
+            print(f"  {name:<30} {cumulative_us / 1000:6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import copy
+
+from example_responses import example_response_1
+
+# Synthetic screener payloads shared by the benchmarks.
+
+OPTIONS_PER_SCREEN = 1000
+OPTIONS_PER_UNDERLIER = 10
+
+
+# Builds a screen of OPTIONS_PER_SCREEN options by repeating the options in
+# example_response_1 across as many underliers as needed.
+def build_large_response():
+    data = copy.deepcopy(example_response_1)
+    template = data["ScreenData"]["underliers"][0]
+    template_options = template.pop("options")
+
+    underliers = []
+    for i in range(OPTIONS_PER_SCREEN // OPTIONS_PER_UNDERLIER):
+        underlier = dict(template, symbol=f"SYM{i}")
+        underlier["options"] = [
+            dict(template_options[(i * OPTIONS_PER_UNDERLIER + j) % len(template_options)], symbol=f"SYM{i}--{j}")
+            for j in range(OPTIONS_PER_UNDERLIER)
+        ]
+        underliers.append(underlier)
+    data["ScreenData"]["underliers"] = underliers
+    data["ScreenData"]["optionscount"] = OPTIONS_PER_SCREEN
+    return data
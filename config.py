@@ -0,0 +1,54 @@
+import os
+
+from rules import Rules, read_config_file
+
+# Keys of a config file's optional "schedule" section, overriding the
+# options_screener constants of the same meaning.
+SCHEDULE_KEYS = {"adaptive", "min_poll_seconds", "max_poll_seconds", "market_hours_only"}
+
+
+# Everything a rules file configures: the compiled rules, and the schedule
+# section as a dict.
+class ScreenerConfig:
+    def __init__(self, rules, schedule=None):
+        self.rules = rules
+        self.schedule = schedule or {}
+
+    @classmethod
+    def from_file(cls, path):
+        config = read_config_file(path)
+        schedule = config.get("schedule", {})
+        unknown = set(schedule) - SCHEDULE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown schedule settings: {', '.join(sorted(unknown))}.")
+        return cls(Rules.from_config(config), dict(schedule))
+
+
+# Watches a config file by polling its modification time and size, which is
+# cheap enough to do before every poll and needs no inotify support.
+class ConfigWatcher:
+    def __init__(self, path, load=ScreenerConfig.from_file):
+        self.path = path
+        self.load = load
+        self._stamp = self._stat()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # Returns the reloaded config if the file changed since it was last read,
+    # else None. A file that fails to load, e.g. because it is half written,
+    # is reported and skipped, keeping the current config until the next change.
+    def poll(self):
+        stamp = self._stat()
+        if stamp is None or stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        try:
+            return self.load(self.path)
+        except Exception as e:  # any error in a hand-edited file must not stop polling
+            print(f"Not reloading {self.path}: {e}")
+            return None
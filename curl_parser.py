@@ -0,0 +1,244 @@
+import copy
+import functools
+import re
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+# curl options that take a value. Any other option is treated as a flag, e.g.
+# --compressed, -k or --http2, which browsers add but don't change the request.
+DATA_OPTIONS = {"-d", "--data", "--data-raw", "--data-binary", "--data-ascii", "--data-urlencode"}
+HEADER_OPTIONS = {"-H", "--header"}
+COOKIE_OPTIONS = {"-b", "--cookie"}
+METHOD_OPTIONS = {"-X", "--request"}
+VALUE_OPTIONS = DATA_OPTIONS | HEADER_OPTIONS | COOKIE_OPTIONS | METHOD_OPTIONS | {
+    "--url", "-A", "--user-agent", "-e", "--referer", "-u", "--user", "-o", "--output", "-m", "--max-time",
+    "--connect-timeout", "-x", "--proxy", "-F", "--form", "-c", "--cookie-jar", "-T", "--upload-file",
+}
+SHORT_VALUE_OPTIONS = {option for option in VALUE_OPTIONS if len(option) == 2}
+
+# Headers the HTTP client manages itself: encodings it can decode, the body
+# length, and the conditional request headers for the previous response.
+DROPPED_HEADERS = {"accept-encoding", "content-length", "if-none-match", "if-modified-since"}
+
+_ANSI_C_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "a": "\a", "b": "\b", "f": "\f", "v": "\v", "e": "\x1b", "E": "\x1b"}
+_ANSI_C_ESCAPE = re.compile(r"\\(x[0-9a-fA-F]{1,2}|u[0-9a-fA-F]{1,4}|U[0-9a-fA-F]{1,8}|[0-7]{1,3}|.)", re.DOTALL)
+
+
+def _ansi_c_unescape(match):
+    escape = match.group(1)
+    if escape[0] in "xuU" and len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    if escape[0].isdigit():
+        return chr(int(escape, 8))
+    return _ANSI_C_ESCAPES.get(escape, escape)
+
+
+# Splits a shell command into words the way bash does, for the quoting browsers
+# use when copying a request as cURL: 'single', "double" and $'ANSI-C' quotes,
+# backslash escapes and backslash-newline line continuations. Chrome's Windows
+# (cmd) variant escapes with carets instead, which are undone first.
+def split_command(command):
+    if '^"' in command:
+        command = re.sub(r"\^(.)", r"\1", command, flags=re.DOTALL)
+    words = []
+    word = None
+    i = 0
+    while i < len(command):
+        char = command[i]
+        if char.isspace():
+            if word is not None:
+                words.append(word)
+                word = None
+            i += 1
+        elif char == "\\":
+            if command[i + 1:i + 2] != "\n":
+                word = (word or "") + command[i + 1:i + 2]
+            i += 2
+        elif char == "'":
+            end = command.find("'", i + 1)
+            if end < 0:
+                raise ValueError("Unterminated ' quote in cURL command.")
+            word = (word or "") + command[i + 1:end]
+            i = end + 1
+        elif char == "$" and command[i + 1:i + 2] == "'":
+            match = re.compile(r"((?:[^'\\]|\\.)*)'", re.DOTALL).match(command, i + 2)
+            if match is None:
+                raise ValueError("Unterminated $' quote in cURL command.")
+            word = (word or "") + _ANSI_C_ESCAPE.sub(_ansi_c_unescape, match.group(1))
+            i = match.end()
+        elif char == '"':
+            match = re.compile(r'((?:[^"\\]|\\.)*)"', re.DOTALL).match(command, i + 1)
+            if match is None:
+                raise ValueError('Unterminated " quote in cURL command.')
+            # Inside double quotes a backslash only escapes $ ` " \ and newlines.
+            word = (word or "") + re.sub(r'\\([$`"\\\n])', lambda m: "" if m.group(1) == "\n" else m.group(1), match.group(1))
+            i = match.end()
+        else:
+            word = (word or "") + char
+            i += 1
+    if word is not None:
+        words.append(word)
+    return words
+
+
+# Splits a -H value into (name, value) the way curl does: "Name: value", or
+# "Name;" for a header sent with an empty value. Returns None for "Name:",
+# which tells curl not to send the header, and for a value with neither.
+def parse_header(header):
+    name, colon, value = header.partition(":")
+    if colon:
+        value = value.strip()
+        return (name.strip(), value) if value else None
+    header = header.rstrip()
+    if header.endswith(";"):
+        return header[:-1].strip(), ""
+    return None
+
+
+# Splits "name=value; name=value" into a dict.
+def parse_cookie_string(cookie_string):
+    cookies = {}
+    for cookie in cookie_string.split(";"):
+        if "=" in cookie:
+            name, value = cookie.split("=", 1)
+            cookies[name.strip()] = value.strip()
+    return cookies
+
+
+# Parses a query string into a dict, decoding percent-escapes. A parameter
+# given more than once maps to a list of its values.
+def parse_query_string(query_string):
+    params = {}
+    for name, value in parse_qsl(query_string, keep_blank_values=True):
+        if name in params:
+            existing = params[name]
+            params[name] = existing + [value] if isinstance(existing, list) else [existing, value]
+        else:
+            params[name] = value
+    return params
+
+
+# Parses a "Copy as cURL" command from Chrome or Firefox, either the bash or
+# Chrome's cmd variant, into a request template: {"url", "method", "headers",
+# "cookies", "query_params", "data"}. The URL is returned without its query
+# string, which is decoded into query_params. Cookies come from -b/--cookie
+# or a Cookie header. Raises ValueError for a command that isn't a usable
+# HTTP(S) request.
+def parse_curl(command):
+    words = split_command(command.strip())
+    if not words or words[0] != "curl":
+        raise ValueError("Not a cURL command: it should start with 'curl'.")
+
+    url = None
+    method = None
+    headers = {}
+    cookies = {}
+    data = []
+    get = False
+    i = 1
+    while i < len(words):
+        word = words[i]
+        i += 1
+        if not word.startswith("-") or word == "-":
+            url = url or word
+            continue
+
+        option, value = word, None
+        if word.startswith("--") and "=" in word:
+            option, value = word.split("=", 1)
+        elif not word.startswith("--") and len(word) > 2 and word[:2] in SHORT_VALUE_OPTIONS:
+            option, value = word[:2], word[2:]  # e.g. -XPOST
+        if option in ("-G", "--get"):
+            get = True
+            continue
+        if option not in VALUE_OPTIONS:
+            continue
+        if value is None:
+            if i == len(words):
+                raise ValueError(f"cURL option {option} is missing its value.")
+            value = words[i]
+            i += 1
+
+        if option in HEADER_OPTIONS:
+            header = parse_header(value)
+            if header is None:
+                continue
+            name, header_value = header
+            if name.lower() == "cookie":
+                cookies.update(parse_cookie_string(header_value))
+            elif name.lower() not in DROPPED_HEADERS:
+                headers[name] = header_value
+        elif option in COOKIE_OPTIONS:
+            cookies.update(parse_cookie_string(value))
+        elif option in METHOD_OPTIONS:
+            method = value.upper()
+        elif option in DATA_OPTIONS:
+            data.append(value)
+        elif option == "--url":
+            url = value
+        elif option in ("-A", "--user-agent"):
+            headers["User-Agent"] = value
+        elif option in ("-e", "--referer"):
+            headers["Referer"] = value
+
+    if url is None:
+        raise ValueError("cURL command has no URL.")
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        raise ValueError(f"cURL command URL {url!r} isn't an http(s) URL.")
+
+    query_params = parse_query_string(parts.query)
+    body = "&".join(data) if data else None
+    if get and body is not None:
+        query_params.update(parse_query_string(body))
+        body = None
+    return {
+        "url": urlunsplit((parts.scheme, parts.netloc, parts.path, "", "")),
+        "method": method or ("POST" if body is not None else "GET"),
+        "headers": headers,
+        "cookies": cookies,
+        "query_params": query_params,
+        "data": body,
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_curl_cached(command):
+    return parse_curl(command)
+
+
+# parse_curl() for commands parsed over and over, e.g. api_keys.py's cURL
+# strings re-read while waiting for new credentials. Returns a copy, so
+# callers can change it without affecting the cache.
+def parse_curl_cached(command):
+    return copy.deepcopy(_parse_curl_cached(command))
+
+
+# Splits the text of a file of cURL commands into commands: each starts with
+# a line beginning with "curl" and carries on until the next one. Lines
+# starting with # are comments.
+def split_curl_file(text):
+    commands = []
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith("#"):
+            continue
+        if stripped.startswith("curl ") or stripped == "curl":
+            commands.append(line)
+        elif commands:
+            commands[-1] += line
+    return commands
+
+
+# Parses every cURL command in the file at path into request templates.
+def load_curl_file(path):
+    with open(path) as f:
+        commands = split_curl_file(f.read())
+    if not commands:
+        raise ValueError(f"No cURL commands in {path}.")
+    templates = []
+    for number, command in enumerate(commands, 1):
+        try:
+            templates.append(parse_curl(command))
+        except ValueError as e:
+            raise ValueError(f"{path}, command {number}: {e}") from None
+    return templates
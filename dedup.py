@@ -0,0 +1,88 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+
+DEFAULT_MAX_KEYS = 100_000  # roughly 23MB at ~230 bytes per key
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+# Returns a stable 64-bit key for an option trade. Unlike hash(), this is the
+# same in every process, so keys can be persisted and compared across restarts.
+def option_key(symbol, trade_price, trade_time):
+    digest = hashlib.blake2b(f"{symbol}|{trade_price}|{trade_time}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+# Returns the market-local date for a timestamp, so a trading day rolls over at
+# midnight New York time.
+def trading_day(timestamp):
+    return datetime.fromtimestamp(timestamp, MARKET_TIMEZONE).date()
+
+
+# Bounded set of already-seen option keys. Keys expire ttl_seconds after they
+# were last added, the whole store is cleared when the trading day changes if
+# reset_daily is set, and once max_keys is reached the least recently added key
+# is evicted. Lookups and inserts are O(1).
+#
+# Supports `key in store` and `store.add(key)`, so it can stand in for a set.
+# If history is given (a HitHistory), keys missing from memory are looked up
+# there too, so options notified before a restart stay deduplicated.
+class DedupStore:
+    def __init__(self, max_keys=DEFAULT_MAX_KEYS, ttl_seconds=DEFAULT_TTL_SECONDS, reset_daily=False, clock=time.time, history=None):
+        self.max_keys = max_keys
+        self.ttl_seconds = ttl_seconds
+        self.reset_daily = reset_daily
+        self.clock = clock
+        self.history = history
+        self._last_seen = OrderedDict()  # key -> timestamp, least recently added first
+        self._day = trading_day(clock())
+        self.evicted = 0
+        self.expired = 0
+
+    def _expire(self, now):
+        if self.reset_daily:
+            today = trading_day(now)
+            if today != self._day:
+                self.expired += len(self._last_seen)
+                self._last_seen.clear()
+                self._day = today
+
+        if self.ttl_seconds is not None:
+            cutoff = now - self.ttl_seconds
+            while self._last_seen:
+                key, seen_at = next(iter(self._last_seen.items()))
+                if seen_at > cutoff:
+                    break
+                del self._last_seen[key]
+                self.expired += 1
+
+    def __contains__(self, key):
+        self._expire(self.clock())
+        if key in self._last_seen:
+            return True
+        if self.history is not None and key in self.history:
+            self.add(key)
+            return True
+        return False
+
+    def __len__(self):
+        return len(self._last_seen)
+
+    def add(self, key):
+        now = self.clock()
+        self._expire(now)
+        self._last_seen[key] = now
+        self._last_seen.move_to_end(key)
+        while len(self._last_seen) > self.max_keys:
+            self._last_seen.popitem(last=False)
+            self.evicted += 1
+
+    # Adds today's keys from history, so a restart doesn't re-notify them.
+    def load_history(self):
+        if self.history is not None:
+            for key in self.history.load_keys():
+                self.add(key)
@@ -0,0 +1,109 @@
+import hashlib
+import re
+
+from metrics import metrics
+from screening import REJECTIONS, iter_options
+
+# Raw option fields compared between polls. A new trade changes trade.time,
+# ovol or trade.price; ask, ooi and exp are included because the filters also
+# read them, so an option that failed before can start passing without a trade.
+CHANGE_FIELDS = ('trade.time', 'ovol', 'trade.price', 'ask', 'ooi', 'exp')
+
+
+# Matches the responseTime field of a raw response, which changes every poll
+# even when nothing else does.
+RESPONSE_TIME_FIELD = re.compile(rb'"responseTime"\s*:\s*"[^"]*"')
+
+
+# Returns a digest of a raw response body, ignoring its responseTime. sha1 is
+# hardware accelerated on most CPUs and several times faster than decoding
+# the body; it isn't used for anything security related.
+def body_fingerprint(body):
+    digest = hashlib.sha1(usedforsecurity=False)
+    match = RESPONSE_TIME_FIELD.search(body)
+    if match is None:
+        digest.update(body)
+    else:
+        view = memoryview(body)
+        digest.update(view[:match.start()])
+        digest.update(view[match.end():])
+    return digest.digest()
+
+
+# Remembers the fingerprint of a screen's previous response, so a poll that
+# returned the same result can skip decoding and screening entirely.
+class ResponseFingerprint:
+    def __init__(self):
+        self._previous = None
+
+    # Returns whether body matches the previous response passed in.
+    def unchanged(self, body):
+        fingerprint = body_fingerprint(body)
+        unchanged = fingerprint == self._previous
+        self._previous = fingerprint
+        return unchanged
+
+    # Forgets the previous response, so the next one is never unchanged.
+    def reset(self):
+        self._previous = None
+
+
+# What changed in a screen between two polls. new and changed are lists of
+# (option, underlier) pairs; disappeared is a list of option symbols.
+class ScreenDelta:
+    def __init__(self, new, changed, disappeared, unchanged):
+        self.new = new
+        self.changed = changed
+        self.disappeared = disappeared
+        self.unchanged = unchanged
+
+    # Returns the options to re-evaluate and their underliers, as two lists.
+    def options_to_screen(self):
+        pairs = self.new + self.changed
+        return [option for option, _ in pairs], [underlier for _, underlier in pairs]
+
+    def summary(self):
+        return (
+            f"{len(self.new)} new, {len(self.changed)} changed, "
+            f"{len(self.disappeared)} disappeared, {self.unchanged} unchanged"
+        )
+
+
+# Tracks one screen's active options across polls, keyed by option symbol
+# (e.g. 'NWSA--250417C00015000'), so each poll only re-evaluates the options
+# whose raw CHANGE_FIELDS differ from the previous poll. Comparing the raw
+# strings skips parsing entirely for unchanged options.
+#
+# Options with no volume can never be hits, so they are dropped as each
+# underlier is read, and only the new and changed options are kept. With a
+# streamed response, the unchanged ones are freed as the stream is read.
+class ScreenDiffer:
+    def __init__(self):
+        self._previous = {}  # symbol -> tuple of raw CHANGE_FIELDS values
+
+    def diff(self, data):
+        current = {}
+        new = []
+        changed = []
+        unchanged = 0
+        for option, underlier in iter_options(data, active_only=True):
+            symbol = option['symbol']
+            signature = tuple(option.get(field) for field in CHANGE_FIELDS)
+            current[symbol] = signature
+
+            previous = self._previous.get(symbol)
+            if previous is None:
+                new.append((option, underlier))
+            elif previous != signature:
+                changed.append((option, underlier))
+            else:
+                unchanged += 1
+
+        disappeared = [symbol for symbol in self._previous if symbol not in current]
+        self._previous = current
+        metrics.inc(REJECTIONS, unchanged, rule="unchanged")
+        return ScreenDelta(new, changed, disappeared, unchanged)
+
+    # Forgets the previous poll, so every option of the next one is new.
+    def reset(self):
+        self._previous = {}
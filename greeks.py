@@ -0,0 +1,167 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from scipy.special import ndtr
+except ImportError:
+    ndtr = None
+
+RISK_FREE_RATE = 0.04  # annual, continuously compounded; dividends are ignored
+MIN_YEARS_TO_EXPIRY = 1 / (365 * 24)  # an hour, so options expiring today still price
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 5.0
+PRICE_TOLERANCE = 1e-6  # dollars
+MAX_ITERATIONS = 50
+DEFAULT_CACHE_SIZE = 100_000
+
+_SQRT_2PI = math.sqrt(2 * math.pi)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+# Standard normal CDF: scipy's if it is installed, else Abramowitz and Stegun
+# 26.2.17, accurate to 7.5e-8.
+def norm_cdf(x):
+    if ndtr is not None:
+        return ndtr(x)
+    z = np.abs(x)
+    t = 1 / (1 + 0.2316419 * z)
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper = norm_pdf(z) * poly
+    return np.where(x >= 0, 1 - upper, upper)
+
+
+def _d1(spot, strike, years, volatility, rate):
+    return (np.log(spot / strike) + (rate + 0.5 * volatility * volatility) * years) / (volatility * np.sqrt(years))
+
+
+# Returns the Black-Scholes price and vega of European options, elementwise.
+def price_and_vega(spot, strike, years, volatility, is_call, rate=RISK_FREE_RATE):
+    d1 = _d1(spot, strike, years, volatility, rate)
+    d2 = d1 - volatility * np.sqrt(years)
+    discounted_strike = strike * np.exp(-rate * years)
+    call = spot * norm_cdf(d1) - discounted_strike * norm_cdf(d2)
+    # Put-call parity gives the put from the call.
+    price = np.where(is_call, call, call - spot + discounted_strike)
+    vega = spot * norm_pdf(d1) * np.sqrt(years)
+    return price, vega
+
+
+# Returns the implied volatility of every option at once, NaN where the price
+# is outside the no-arbitrage bounds or the solver doesn't converge.
+#
+# Newton's method on vega, safeguarded by a per-option bracket: a step that
+# leaves the bracket is replaced by bisection, so deep in- or out-of-the-money
+# options with tiny vega still converge. Each iteration only works on the
+# options that haven't converged yet.
+def implied_volatility(price, spot, strike, years, is_call, rate=RISK_FREE_RATE):
+    price, spot, strike, years, is_call = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(spot, dtype=float), np.asarray(strike, dtype=float),
+        np.maximum(np.asarray(years, dtype=float), MIN_YEARS_TO_EXPIRY), np.asarray(is_call, dtype=bool),
+    )
+    discounted_strike = strike * np.exp(-rate * years)
+    lower_bound = np.where(is_call, np.maximum(spot - discounted_strike, 0), np.maximum(discounted_strike - spot, 0))
+    upper_bound = np.where(is_call, spot, discounted_strike)
+    with np.errstate(invalid='ignore'):
+        valid = (price > lower_bound) & (price < upper_bound) & (spot > 0) & (strike > 0)
+
+    volatility = np.full(price.shape, np.nan)
+    rows = np.flatnonzero(valid)
+    # Brenner-Subrahmanyam at-the-money approximation as the starting point.
+    guess = np.clip(price[rows] / spot[rows] * np.sqrt(2 * np.pi / years[rows]), 0.05, 3.0)
+    low = np.full(len(rows), MIN_VOLATILITY)
+    high = np.full(len(rows), MAX_VOLATILITY)
+    p, s, k, t, c = price[rows], spot[rows], strike[rows], years[rows], is_call[rows]
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(MAX_ITERATIONS):
+            if not len(rows):
+                break
+            model, vega = price_and_vega(s, k, t, guess, c, rate)
+            error = model - p
+            converged = np.abs(error) < PRICE_TOLERANCE
+            volatility[rows[converged]] = guess[converged]
+
+            too_high = error > 0
+            high = np.where(too_high, guess, high)
+            low = np.where(too_high, low, guess)
+            newton = guess - error / vega
+            in_bracket = (vega > 1e-12) & (newton > low) & (newton < high)
+            guess = np.where(in_bracket, newton, (low + high) / 2)
+
+            pending = ~converged
+            rows, guess, low, high = rows[pending], guess[pending], low[pending], high[pending]
+            p, s, k, t, c = p[pending], s[pending], k[pending], t[pending], c[pending]
+
+    return volatility
+
+
+# Returns delta and gamma of every option at once.
+def delta_gamma(spot, strike, years, volatility, is_call, rate=RISK_FREE_RATE):
+    years = np.maximum(years, MIN_YEARS_TO_EXPIRY)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = _d1(spot, strike, years, volatility, rate)
+        delta = np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1)
+        gamma = norm_pdf(d1) / (spot * volatility * np.sqrt(years))
+    return delta, gamma
+
+
+# Returns the price to solve implied volatility from: the trade price, or the
+# bid/ask midpoint for an option that hasn't traded.
+def reference_price(trade_price, bid, ask):
+    if trade_price > 0:
+        return trade_price
+    if bid and ask:
+        return (bid + ask) / 2
+    return ask or 0.0
+
+
+# Fills in implied_volatility, delta and gamma on OptionRecords, solving all
+# of a poll's records at once. Results are cached per (symbol, price,
+# underlying price, days to expiry), the inputs that change the answer, so an
+# option seen again unchanged in a later poll isn't solved again. The cache
+# keeps the cache_size most recently used results.
+class GreeksCalculator:
+    def __init__(self, rate=RISK_FREE_RATE, cache_size=DEFAULT_CACHE_SIZE):
+        self.rate = rate
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # key -> (implied volatility, delta, gamma)
+        self.hits = 0
+        self.misses = 0
+
+    def enrich(self, records):
+        keys = [(r.symbol, reference_price(r.trade_price, r.bid, r.ask), r.underlying_price, r.exp) for r in records]
+        results = {}  # this poll's greeks, so evicting never loses one still needed
+        missing = {}
+        for record, key in zip(records, keys):
+            if key in results or key in missing:
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                missing[key] = record
+            else:
+                self.cache.move_to_end(key)
+                results[key] = cached
+        self.hits += len(records) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            solved = list(missing.values())
+            price = np.array([key[1] for key in missing])
+            spot = np.array([r.underlying_price for r in solved])
+            strike = np.array([r.strike for r in solved])
+            years = np.array([r.exp for r in solved], dtype=float) / 365
+            is_call = np.array([r.is_call for r in solved])
+            volatility = implied_volatility(price, spot, strike, years, is_call, self.rate)
+            delta, gamma = delta_gamma(spot, strike, years, volatility, is_call, self.rate)
+            for key, values in zip(missing, zip(volatility.tolist(), delta.tolist(), gamma.tolist())):
+                results[key] = self.cache[key] = tuple(None if math.isnan(value) else value for value in values)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        for record, key in zip(records, keys):
+            record.implied_volatility, record.delta, record.gamma = results[key]
@@ -0,0 +1,82 @@
+import json
+import sqlite3
+import threading
+import time
+
+from dedup import trading_day
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hits (
+    key INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    trade_time INTEGER NOT NULL,
+    trade_price REAL NOT NULL,
+    trading_day TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    hit TEXT NOT NULL,
+    PRIMARY KEY (trading_day, key)
+);
+CREATE INDEX IF NOT EXISTS hits_by_symbol ON hits (symbol, trade_time);
+"""
+
+
+# SQLite stores signed 64-bit integers, so unsigned option keys are shifted
+# into that range on the way in and back out.
+def _to_signed(key):
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+# Persistent record of every hit the screener has emitted, in a SQLite database
+# in WAL mode so writes don't block reads. Used to remember which options were
+# already notified across restarts.
+class HitHistory:
+    def __init__(self, path, clock=time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # Returns the option keys recorded for a trading day (today by default).
+    def load_keys(self, day=None):
+        day = day or trading_day(self.clock())
+        with self._lock:
+            rows = self._db.execute("SELECT key FROM hits WHERE trading_day = ?", (day.isoformat(),)).fetchall()
+        return [_to_unsigned(key) for (key,) in rows]
+
+    # Returns whether an option key was already recorded today.
+    def __contains__(self, key):
+        day = trading_day(self.clock()).isoformat()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM hits WHERE trading_day = ? AND key = ?", (day, _to_signed(key))
+            ).fetchone()
+        return row is not None
+
+    # Records hits, as OptionRecords returned by screen_options().
+    def record_hits(self, hits):
+        now = self.clock()
+        day = trading_day(now).isoformat()
+        rows = [
+            (
+                _to_signed(hit.key),
+                hit.symbol,
+                hit.trade_time,
+                hit.trade_price,
+                day,
+                now,
+                json.dumps(hit.to_dict()),
+            )
+            for hit in hits
+        ]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR IGNORE INTO hits VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
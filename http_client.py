@@ -0,0 +1,265 @@
+import random
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import create_cookie
+
+from metrics import metrics
+
+PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+DEFAULT_MAX_ATTEMPTS = 3  # per fetch, including the first
+MIN_RETRY_SECONDS = 1
+MAX_RETRY_SECONDS = 30
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failed fetches before the circuit opens
+CIRCUIT_OPEN_SECONDS = 5 * 60  # how long an open circuit skips fetches
+
+
+# Returns a requests.Session whose HTTP(S) adapters keep up to pool_size
+# connections alive per host, so repeat requests skip the TCP+TLS handshake.
+#
+# A refreshed cookie replaces every cookie of the same name in the session,
+# whatever domain or path the old one was stored under. Otherwise a cookie
+# seeded from a cURL string and its refreshed copy from a Set-Cookie on
+# another domain (e.g. .etrade.com) would both be sent, stale one first.
+def make_session(pool_size=DEFAULT_POOL_SIZE):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    # Response hooks run before requests stores the response's cookies, so
+    # this only removes the old ones.
+    def drop_refreshed_cookies(response, **kwargs):
+        refreshed = {cookie.name for cookie in response.cookies}
+        if refreshed:
+            for cookie in [cookie for cookie in session.cookies if cookie.name in refreshed]:
+                session.cookies.clear(cookie.domain, cookie.path, cookie.name)
+        return response
+
+    session.hooks["response"].append(drop_refreshed_cookies)
+    return session
+
+
+# Adds cookies (a name -> value dict, e.g. from a cURL string) to a session's
+# jar, scoped to url's host like cookies the host sets itself.
+def seed_cookies(session, cookies, url):
+    host = urlsplit(url).hostname
+    for name, value in cookies.items():
+        session.cookies.set_cookie(create_cookie(name, value, domain=host, path="/"))
+
+
+# Tracks request latency and how many requests had to open a new connection.
+class LatencyStats:
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.cold_seconds = 0.0  # requests that opened a connection
+        self.warm_seconds = 0.0  # requests that reused a pooled connection
+
+    def record(self, seconds, new_connection):
+        self.requests += 1
+        if new_connection:
+            self.new_connections += 1
+            self.cold_seconds += seconds
+        else:
+            self.warm_seconds += seconds
+
+    def summary(self):
+        reused = self.requests - self.new_connections
+        cold_ms = self.cold_seconds / self.new_connections * 1000 if self.new_connections else 0
+        warm_ms = self.warm_seconds / reused * 1000 if reused else 0
+        return (
+            f"requests: {self.requests}, new connections: {self.new_connections}, "
+            f"avg new-connection latency: {cold_ms:.0f}ms, avg reused-connection latency: {warm_ms:.0f}ms"
+        )
+
+
+# Returns how many connections the session's pools for this URL's scheme have
+# opened so far.
+def _connections_opened(session, url):
+    pools = session.get_adapter(url).poolmanager.pools
+    return sum(pools[key].num_connections for key in pools.keys())
+
+
+# Sends a request through the session and records its latency in stats.
+def timed_request(session, stats, method, url, **kwargs):
+    opened_before = _connections_opened(session, url)
+    start = time.perf_counter()
+    response = session.request(method, url, **kwargs)
+    stats.record(time.perf_counter() - start, _connections_opened(session, url) > opened_before)
+    return response
+
+
+# Returns how long to wait before retry number attempt (1 for the first): a
+# random time up to an exponentially growing cap ("full jitter"), so screens
+# that failed together don't retry together. A Retry-After header in seconds
+# is honoured as a minimum.
+def retry_delay(attempt, response=None):
+    delay = random.uniform(MIN_RETRY_SECONDS, min(MAX_RETRY_SECONDS, MIN_RETRY_SECONDS * 2 ** attempt))
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    if retry_after.isdigit():
+        delay = max(delay, min(int(retry_after), MAX_RETRY_SECONDS))
+    return delay
+
+
+# Stops fetching from an endpoint that keeps failing. After failure_threshold
+# consecutive failed fetches the circuit opens and fetches are skipped for
+# open_seconds. Then one trial fetch is let through: success closes the
+# circuit, failure opens it again.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, open_seconds=CIRCUIT_OPEN_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None and self.clock() - self.opened_at < self.open_seconds
+
+    # Returns whether a fetch may go ahead now.
+    def allow(self):
+        return not self.is_open
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        # A failed trial fetch after the circuit was open reopens it at once.
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            if not self.is_open:
+                metrics.inc("screener_circuit_opened_total")
+            self.opened_at = self.clock()
+
+
+# Client for the ETRADE screener endpoint, made from a request template parsed
+# by curl_parser.parse_curl(), and sent with the method and body the browser
+# used. Cookies from the cURL string seed the session's cookie jar, which then
+# picks up refreshed cookies from every response on its own. Pass session to share one pool and cookie jar between
+# several screens.
+#
+# If the endpoint sends an ETag or Last-Modified header, the next request is
+# made conditional on it, and an unchanged screen comes back as an empty 304.
+#
+# Timeouts, connection errors, other request errors (e.g. a truncated chunked
+# body) and RETRY_STATUS_CODES are retried up to
+# max_attempts times with retry_delay() between attempts. A 401 is returned at
+# once, since only new cookies fix it. Fetches that still fail count towards
+# the client's circuit breaker.
+class ScreenerClient:
+    def __init__(self, url, headers, cookies, query_params, method="GET", data=None, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 session=None, max_attempts=DEFAULT_MAX_ATTEMPTS, circuit_breaker=None, sleep=time.sleep):
+        self.url = url
+        self.headers = headers
+        self.query_params = query_params
+        self.method = method
+        self.data = data
+        self.timeout = timeout
+        self.session = session if session is not None else make_session(pool_size)
+        seed_cookies(self.session, cookies, url)
+        self.stats = LatencyStats()
+        self.validators = {}  # conditional request headers for the last response
+        self.max_attempts = max_attempts
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self.sleep = sleep
+
+    # Returns the screener's response, or None if the circuit is open or every
+    # attempt failed with a request error or retryable status.
+    # Other error statuses are returned for the caller to report.
+    def fetch(self, stream=False):
+        if not self.circuit_breaker.allow():
+            print("Screener circuit open after repeated failures, skipping fetch.")
+            metrics.inc("screener_skipped_fetches_total")
+            return None
+
+        with metrics.time("screener_stage_seconds", stage="fetch"):
+            for attempt in range(1, self.max_attempts + 1):
+                response = self._attempt(stream)
+                if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                    break
+                if attempt == self.max_attempts:
+                    if response is not None:
+                        response.close()
+                    response = None
+                    break
+                delay = retry_delay(attempt, response)
+                if response is not None:
+                    response.close()
+                metrics.inc("screener_fetch_retries_total")
+                print(f"Screener fetch failed, retrying in {delay:.1f}s (attempt {attempt} of {self.max_attempts}).")
+                self.sleep(delay)
+
+        if response is None or (response.status_code >= 400 and response.status_code != 401):
+            self.circuit_breaker.record_failure()
+        elif response.status_code != 401:
+            self.circuit_breaker.record_success()
+        return response
+
+    # Makes a lightweight request to keep the session alive: the screen is
+    # requested through the same session, but its body isn't downloaded.
+    # Returns the status code.
+    def keepalive(self):
+        with self.session.request(self.method, self.url, headers=self.headers, params=self.query_params, data=self.data,
+                                  timeout=self.timeout, stream=True) as response:
+            return response.status_code
+
+    # Makes one request. Returns None on a timeout, connection error or any
+    # other request error, e.g. a body cut short or too many redirects.
+    def _attempt(self, stream):
+        headers = dict(self.headers, **self.validators) if self.validators else self.headers
+        start = time.perf_counter()
+        try:
+            response = timed_request(
+                self.session, self.stats, self.method, self.url,
+                headers=headers, params=self.query_params, data=self.data, timeout=self.timeout, stream=stream,
+            )
+        except requests.RequestException as e:
+            if isinstance(e, requests.Timeout):
+                error = "timeout"
+            elif isinstance(e, requests.ConnectionError):
+                error = "connection"
+            else:
+                error = "invalid"
+            metrics.observe("screener_fetch_attempt_seconds", time.perf_counter() - start, outcome=error)
+            metrics.inc("screener_responses_total", status=error)
+            print(f"Screener request failed: {e}")
+            return None
+        outcome = "success" if response.status_code in (200, 304) else "error"
+        metrics.observe("screener_fetch_attempt_seconds", time.perf_counter() - start, outcome=outcome)
+        metrics.inc("screener_responses_total", status=response.status_code)
+        if response.status_code == 200:
+            self.validators = {}
+            if "ETag" in response.headers:
+                self.validators["If-None-Match"] = response.headers["ETag"]
+            if "Last-Modified" in response.headers:
+                self.validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        return response
+
+
+# Client for the Pushover messages API, on its own pooled session.
+class PushoverClient:
+    def __init__(self, app_token, user_key, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.app_token = app_token
+        self.user_key = user_key
+        self.timeout = timeout
+        self.session = make_session(pool_size)
+        self.stats = LatencyStats()
+
+    def send(self, msg, priority=1):
+        data = {
+            "token": self.app_token,
+            "user": self.user_key,
+            "message": msg,
+            "priority": priority,
+        }
+        return timed_request(self.session, self.stats, "POST", PUSHOVER_URL, data=data, timeout=self.timeout)
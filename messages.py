@@ -0,0 +1,21 @@
+# Parses the OptionRecord for a hit into a short string message for notification.
+def format_msg_from_hit(hit):
+    msg = f"{hit.display_symbol}\ncurrent_share_price: {hit.underlying_price_text}\notm_percentage: {hit.otm_percent:.2%}\ndays_to_exp: {hit.exp}\ntrade_price: {hit.trade_price}\ntotal_cost: ${hit.total_premium:,.0f}\ntotal_size: {hit.ovol:,}\nhq_hit: {hit.hq_hit}\nanomaly_score: {hit.anomaly_score:.1f}"
+    if hit.implied_volatility is not None:
+        msg += f"\niv: {hit.implied_volatility:.1%}\ndelta: {hit.delta:.2f}\ngamma: {hit.gamma:.3f}"
+    return msg
+
+
+# Parses a HitCluster of several hits on one underlier into a single message
+# summarising the sweep, followed by its legs.
+def format_msg_from_cluster(cluster):
+    strikes, expirations = cluster.strikes, cluster.expirations
+    msg = (
+        f"{cluster.underlying_symbol} sweep: {len(cluster.hits)} hits across {len(strikes)} strikes and {len(expirations)} expirations\n"
+        f"current_share_price: {cluster.hits[-1].underlying_price_text}\ncalls: {cluster.calls}, puts: {cluster.puts}\n"
+        f"strikes: {strikes[0]:g}-{strikes[-1]:g}\ndays_to_exp: {expirations[0]}-{expirations[-1]}\n"
+        f"total_cost: ${cluster.total_premium:,.0f}\ntotal_size: {cluster.ovol:,}\nhq_hits: {cluster.hq_hits}\n"
+        f"max_anomaly_score: {cluster.max_anomaly_score:.1f}"
+    )
+    legs = sorted(cluster.hits, key=lambda hit: hit.total_premium, reverse=True)
+    return msg + "".join(f"\n{hit.display_symbol}: ${hit.total_premium:,.0f}" for hit in legs)
@@ -0,0 +1,140 @@
+import bisect
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+# Label values may mix types (e.g. status codes and error names), so series are
+# sorted by their rendered form.
+def _series_order(item):
+    return [(name, str(value)) for name, value in item[0]]
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+# Counters and latency histograms for the screener's stages, rendered in the
+# Prometheus text exposition format. Each update is a dict lookup and an add
+# under a lock, cheap enough to wrap every stage of every poll.
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}  # name -> {label_key: value}
+        self._histograms = {}  # name -> {label_key: [per-bucket counts..., +Inf count, sum]}
+        self._collectors = []
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * (len(self.buckets) + 2)
+            values[bisect.bisect_left(self.buckets, seconds)] += 1
+            values[-1] += seconds
+
+    # Returns a context manager timing the enclosed block into histogram name.
+    def time(self, name, **labels):
+        return _Timer(self, name, labels)
+
+    # Returns the total of a counter, or of one labelled series of it.
+    def value(self, name, **labels):
+        with self._lock:
+            series = self._counters.get(name, {})
+            if labels:
+                return series.get(_label_key(labels), 0)
+            return sum(series.values())
+
+    # Adds a callable returning (name, labels, value) samples that are read at
+    # render time, for counters kept outside the registry. With kind="gauge"
+    # the samples are current values, such as a queue depth, instead.
+    def add_collector(self, collector, kind="counter"):
+        self._collectors.append((collector, kind))
+
+    def render(self):
+        lines = []
+        collected = {}
+        kinds = {}
+        for collector, kind in self._collectors:
+            for name, labels, value in collector():
+                collected.setdefault(name, {})[_label_key(labels)] = value
+                kinds[name] = kind
+        with self._lock:
+            for name, series in sorted({**self._counters, **collected}.items()):
+                lines.append(f"# TYPE {name} {kinds.get(name, 'counter')}")
+                for key, value in sorted(series.items(), key=_series_order):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, values in sorted(series.items(), key=_series_order):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, values):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                    count = cumulative + values[-2]
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+# Registry shared by every module of the screener.
+metrics = Metrics()
+
+
+# Serves registry.render() at http://host:port/metrics from a daemon thread.
+def start_metrics_server(port, host="127.0.0.1", registry=metrics):
+    # Imported here so processes that never serve metrics don't load http.server.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep scrapes out of the screener's output
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Serving metrics at http://{host}:{port}/metrics")
+    return server
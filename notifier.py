@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+
+from metrics import metrics
+
+PUSHOVER_MAX_MESSAGE_LENGTH = 1024  # characters
+
+DEFAULT_QUEUE_SIZE = 1000  # hits
+DEFAULT_COALESCE_SECONDS = 2  # how long to wait for more hits to batch together
+MIN_BACKOFF_SECONDS = 5
+MAX_BACKOFF_SECONDS = 15 * 60
+
+SEND_SECONDS = "screener_notification_send_seconds"  # latency histogram of each send attempt
+
+
+# Joins formatted hit messages into as few messages as fit under max_length.
+def coalesce_messages(msgs, max_length=PUSHOVER_MAX_MESSAGE_LENGTH):
+    batches = []
+    current = ""
+    for msg in msgs:
+        candidate = f"{current}\n\n{msg}" if current else msg
+        if current and len(candidate) > max_length:
+            batches.append(current)
+            current = msg
+        else:
+            current = candidate
+    if current:
+        batches.append(current)
+    return [batch[:max_length] for batch in batches]
+
+
+# Counts what the dispatcher has done, for log output. Send latency and dropped
+# hits are also exported through metrics, and the queue depth by samples().
+class DispatcherStats:
+    def __init__(self):
+        self.hits_queued = 0
+        self.hits_dropped = 0
+        self.send_attempts = 0
+        self.messages_sent = 0
+        self.retries = 0
+        self.send_seconds = 0.0
+        self.max_send_seconds = 0.0
+
+    def record_send(self, seconds, accepted):
+        self.send_attempts += 1
+        self.messages_sent += accepted
+        self.send_seconds += seconds
+        self.max_send_seconds = max(self.max_send_seconds, seconds)
+
+    def summary(self, queue_depth):
+        avg_ms = self.send_seconds / self.send_attempts * 1000 if self.send_attempts else 0
+        return (
+            f"queue depth: {queue_depth}, hits queued: {self.hits_queued}, dropped: {self.hits_dropped}, "
+            f"messages sent: {self.messages_sent}, retries: {self.retries}, "
+            f"avg send latency: {avg_ms:.0f}ms, max send latency: {self.max_send_seconds * 1000:.0f}ms"
+        )
+
+
+# Sends notifications for hits from a background thread so the polling loop
+# never waits on Pushover. Hits that arrive together are coalesced into as few
+# messages as possible, and 429 responses back off exponentially instead of
+# sleeping a fixed time after every message.
+#
+# send(msg) must return a response with a status_code; format_hit(hit) turns a
+# hit into its message text.
+#
+# With an aggregator (see aggregation.HitAggregator), hits are held in clusters
+# for its window instead, and each cluster of several hits is sent as one
+# message made by format_cluster(cluster).
+class NotificationDispatcher:
+    def __init__(self, send, format_hit, queue_size=DEFAULT_QUEUE_SIZE, coalesce_seconds=DEFAULT_COALESCE_SECONDS,
+                 aggregator=None, format_cluster=None):
+        self.send = send
+        self.format_hit = format_hit
+        self.coalesce_seconds = coalesce_seconds
+        self.aggregator = aggregator
+        self.format_cluster = format_cluster
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = DispatcherStats()
+        self.backoff_seconds = 0
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+            self._thread.start()
+
+    # Waits up to timeout seconds for queued hits to be sent, then stops.
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Queues hits without blocking. Hits that don't fit in the queue are dropped.
+    def submit(self, hits):
+        for hit in hits:
+            try:
+                self.queue.put_nowait(hit)
+                self.stats.hits_queued += 1
+            except queue.Full:
+                self.stats.hits_dropped += 1
+                metrics.inc("screener_notifications_dropped_total")
+                print(f"Notification queue full, dropping hit: {hit}")
+
+    # Gauge samples for the metrics endpoint, see Metrics.add_collector().
+    def samples(self):
+        yield "screener_notification_queue_depth", {}, self.queue.qsize()
+        yield "screener_notification_backoff_seconds", {}, self.backoff_seconds
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=1)]
+        except queue.Empty:
+            return []
+
+        # Give a burst a moment to finish arriving so it goes out as one message.
+        deadline = time.monotonic() + self.coalesce_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send_with_backoff(self, msg):
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.send(msg)
+                status_code = response.status_code
+            except OSError as e:
+                print(f"Error sending notification: {e}")
+                status_code = None
+            retry = status_code == 429 or status_code is None or status_code >= 500
+            seconds = time.perf_counter() - start
+            self.stats.record_send(seconds, accepted=status_code == 200)
+            metrics.observe(SEND_SECONDS, seconds, outcome="retry" if retry else "sent")
+
+            if retry:
+                self.backoff_seconds = min(max(self.backoff_seconds * 2, MIN_BACKOFF_SECONDS), MAX_BACKOFF_SECONDS)
+                self.stats.retries += 1
+                print(f"Notification not accepted, retrying in {self.backoff_seconds}s.")
+                time.sleep(self.backoff_seconds)
+                continue
+
+            # Ease off the backoff again once Pushover accepts messages.
+            self.backoff_seconds //= 2
+            return
+
+    # Returns the messages for a batch of hits. With an aggregator the batch
+    # joins its clusters, and only clusters whose window has closed are sent.
+    def _messages(self, batch, stopping):
+        if self.aggregator is None:
+            return [self.format_hit(hit) for hit in batch]
+        self.aggregator.add(batch)
+        return [
+            self.format_hit(cluster.hits[0]) if len(cluster.hits) == 1 else self.format_cluster(cluster)
+            for cluster in self.aggregator.flush(force=stopping)
+        ]
+
+    def _run(self):
+        while not (self._stopping.is_set() and self.queue.empty() and not self.aggregator):
+            stopping = self._stopping.is_set()
+            batch = self._next_batch()
+            msgs = self._messages(batch, stopping)
+            for _ in batch:
+                self.queue.task_done()
+            if not msgs:
+                continue
+
+            if len(msgs) > 1:
+                msgs = coalesce_messages(msgs)
+            for msg in msgs:
+                self._send_with_backoff(msg)
+
+            print(f"Notifications {self.stats.summary(self.queue.qsize())}")
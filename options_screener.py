@@ -1,97 +1,149 @@
 #!/usr/bin/env python3
 
+import argparse
+import importlib
 import json
 import os
-import re
-
-import requests
-import shlex
 import time
 
-from api_keys import (
-    CURL_STRING,
-    PUSHOVER_APP_TOKEN,
-    PUSHOVER_USER_KEY,
-)
-
-from example_responses import example_response_1 as mock_response
+from aggregation import HitAggregator
+from baselines import BaselineStore
+from config import ConfigWatcher, ScreenerConfig
+from curl_parser import load_curl_file, parse_curl_cached
+from dedup import DedupStore
+from diffing import ResponseFingerprint, ScreenDiffer
+from history import HitHistory
+from http_client import PushoverClient, ScreenerClient
+from messages import format_msg_from_cluster, format_msg_from_hit
+from metrics import metrics, start_metrics_server
+from notifier import NotificationDispatcher
+from recorder import ResponseRecorder
+from rules import Rules, default_rules_config
+from scheduler import BUSY_WINDOWS, MARKET_SESSIONS, PollScheduler
+from screening import screen_option_list, screen_options
+from sessions import CREDENTIALS_RECHECK_SECONDS, SessionManager
+from streaming import READ_ERRORS, read_response
 
 TESTING = False
 SPEAK = False
 MIN_TOTAL_TRADE_SIZE_FOR_DETECTION = 1000 # $
 MIN_TOTAL_TRADE_SIZE_FOR_HQ_FILTER = 1000
 MAX_DAYS_TO_EXP = 40 # days
+RULES_PATH = None # JSON or YAML rules file replacing the thresholds above, e.g. "example_rules.json"; reloaded when it changes
 RUN_SCREENER_EVERY_X_MINUTES = 1 # minutes
-
-
+ADAPTIVE_POLLING = True # tighten the interval after hits and relax it when quiet or the screener data is stale
+MIN_POLL_SECONDS = 15 # fastest adaptive interval, also used during the opening and closing bursts
+MAX_POLL_SECONDS = 5 * 60 # slowest adaptive interval
+MARKET_HOURS_ONLY = True # suspend polling outside the regular session (9:30-16:00 New York time, weekdays)
+POLL_SCREENS_CONCURRENTLY = False # poll every screen in CURL_STRINGS on one event loop
+SHARD_ACROSS_ACCOUNTS = False # split CURL_STRINGS across the sessions in ACCOUNT_CURL_STRINGS, one worker process each
+CURL_FILE = None # file of "Copy as cURL" commands, one per screen, polled every RUN_SCREENER_EVERY_X_MINUTES instead of CURL_STRINGS
+HTTP_POOL_SIZE = 4 # connections kept alive per host
+HTTP_TIMEOUT = (5, 30) # (connect, read) seconds
+COOKIE_JAR_PATH = "cookies.json" # the live session cookies, saved after every response and reused on restart; None to not save them
+KEEPALIVE_MINUTES = 10 # request the screen this long after the last response, so the session survives quiet periods; None to disable
+NOTIFICATION_QUEUE_SIZE = 1000 # hits waiting to be sent
+NOTIFICATION_COALESCE_SECONDS = 2 # hits arriving this close together share one message
+AGGREGATION_WINDOW_SECONDS = 0 # hits on one underlier within this window are sent as one sweep message; 0 groups each poll's hits without waiting, None sends each hit
+AGGREGATE_BY = ("underlier",) # add "otype" and/or "expiry" to only group hits of the same option type and expiration
+DEDUP_MAX_KEYS = 100_000 # option trades remembered, least recently added evicted first
+DEDUP_TTL_HOURS = 24 # hours before an option trade can notify again
+DEDUP_RESET_DAILY = True # forget every option trade when the trading day changes
+HIT_HISTORY_PATH = "hit_history.sqlite3" # set to None to keep no history across restarts
+INCREMENTAL_SCREENING = True # only re-check options that changed since the previous poll
+ANOMALY_SCORING = True # score hits against each contract's rolling volume baseline and notify the most unusual first
+BASELINE_WINDOW = 30 # volume-rate samples kept per contract
+COMPUTE_GREEKS = True # add implied volatility, delta and gamma to hits
+RISK_FREE_RATE = 0.04 # annual, for the Black-Scholes model behind the greeks
+STREAM_RESPONSES = False # parse responses incrementally as they arrive (needs ijson)
+RECORD_RESPONSES_DIR = None # directory to archive every raw response in, e.g. "recordings"
+METRICS_PORT = None # serve Prometheus metrics at http://127.0.0.1:<port>/metrics, e.g. 9108
+
+
+# Returns the api_keys.py module. Credentials are only read by the modes that
+# poll ETRADE, so importing this script, e.g. from bench_startup, doesn't
+# need them.
+def load_api_keys():
+    return importlib.import_module("api_keys")
+
+
+# Returns the parsed cURL string of every account (ETRADE session) in
+# api_keys.py, re-reading the file so replaced credentials are picked up.
+def load_accounts():
+    api_keys = importlib.reload(importlib.import_module("api_keys"))
+    curl_strings = getattr(api_keys, "ACCOUNT_CURL_STRINGS", [api_keys.CURL_STRING])
+    return [parse_curl_string_to_dict(curl_string) for curl_string in curl_strings]
+
+
+# Blocks until CURL_STRING in api_keys.py holds cookies other than cookies,
+# re-reading the file every CREDENTIALS_RECHECK_SECONDS. Returns it parsed.
+def wait_for_new_credentials(cookies):
+    while True:
+        time.sleep(CREDENTIALS_RECHECK_SECONDS)
+        try:
+            api_keys = importlib.reload(importlib.import_module("api_keys"))
+            parsed_curl_dict = parse_curl_string_to_dict(api_keys.CURL_STRING)
+        except Exception as e:
+            print(f"Error reloading credentials: {e}")
+            continue
+        if parsed_curl_dict["cookies"] != cookies:
+            return parsed_curl_dict
+
+
+pushover_client = None  # made by start_notifications() from the keys in api_keys.py
+
+
+# Filters compiled at startup from RULES_PATH or the thresholds above, and
+# schedule overrides from RULES_PATH. Both are replaced by reload_config().
+if RULES_PATH:
+    _config = ScreenerConfig.from_file(RULES_PATH)
+    RULES, SCHEDULE = _config.rules, _config.schedule
+else:
+    RULES = Rules.from_config(default_rules_config(
+        min_total_trade_size=MIN_TOTAL_TRADE_SIZE_FOR_DETECTION,
+        min_total_trade_size_for_hq=MIN_TOTAL_TRADE_SIZE_FOR_HQ_FILTER,
+        max_days_to_exp=MAX_DAYS_TO_EXP,
+    ))
+    SCHEDULE = {}
+config_watcher = ConfigWatcher(RULES_PATH) if RULES_PATH else None
+baselines = BaselineStore(window=BASELINE_WINDOW) if ANOMALY_SCORING else None
+# Imported only when enabled, as greeks loads scipy when it is installed.
+if COMPUTE_GREEKS:
+    from greeks import GreeksCalculator
+    greeks = GreeksCalculator(rate=RISK_FREE_RATE)
+else:
+    greeks = None
+schedulers = []  # every PollScheduler made by make_scheduler(), to reconfigure on reload
+screen_states = []  # every ScreenDiffer and ResponseFingerprint made by make_differ() and make_fingerprint(), to reset on reload
+metrics.add_collector(lambda: RULES.samples())
+
+
+# Adds the header the ETRADE screener endpoint expects to a request template
+# from curl_parser.parse_curl().
+def screener_request(template):
+    template["headers"]["action"] = "retrieveScreenPrefillData"
+    return template
+
+
+# Returns the screener request for a "Copy as cURL" command, see
+# curl_parser.parse_curl(). Raises ValueError if it can't be used.
 def parse_curl_string_to_dict(curl_string):
-    lines = shlex.split(curl_string)
-    lines = [" ".join(lines[i:i+2]) for i in range(0, len(lines), 2)]
-
-    url = None
-    query_params = {}
-    headers = {}
-    cookies = {}
-
-    # Extract the URL, headers, cookies, and query parameters
-    for line in lines:
-        if line.startswith("curl"):
-            url_and_query_params = line.split(" ")[1].strip("'")
-            url, query_string = url_and_query_params.split("?")
-            for param in query_string.split("&"):
-                key, value = param.split("=")
-                query_params[key] = value.strip("'")
-        elif line.startswith("-H"):
-            header = line[3:].split(": ")
-            headers[header[0]] = header[1].strip("'")
-        elif line.startswith("-b"):
-            cookie_string = line[3:].split(";")
-            for cookie in cookie_string:
-                if "=" in cookie:
-                    key, value = cookie.split("=", 1)
-                    cookies[key.strip()] = value.strip("'")
-
-    headers["action"] = "retrieveScreenPrefillData"
+    return screener_request(parse_curl_cached(curl_string))
 
-    return {
-        "url": url,
-        "headers": headers,
-        "cookies": cookies,
-        "query_params": query_params
-    }
-
-
-def clean_int(val):
-    val = str(val).strip()
-    if not val or val in ['--', 'NaN']:
-        return 0
-    try:
-        return int(re.sub(r'[^\d]', '', val))  # removes commas and non-digits
-    except ValueError:
-        return 0
-
-
-def clean_float(val):
-    val = str(val).strip()
-    if not val or val in ['--', 'NaN']:
-        return 0.0
-    try:
-        return float(re.sub(r'[^\d.\-]', '', val))
-    except ValueError:
-        return 0.0
 
-
-def clean_option_object(opt):
-    # Parse values from the option object from strings to floats/ints.
-    opt['trade.price'] = clean_float(opt['trade.price'])
-    opt['trade.time'] = clean_int(opt['trade.time'])
-    opt['ask'] = clean_float(opt['ask'])
-    opt['bid'] = clean_float(opt['bid'])
-    opt['strp'] = clean_float(opt['strp'])
-    opt['ovol'] = clean_int(opt['ovol'])
-    opt['ooi'] = clean_int(opt['ooi']) if 'ooi' in opt else 0
-    opt['exp'] = clean_int(opt['exp'])
-    return opt
+# Returns the screens to poll concurrently or shard, as (parsed_curl_dict,
+# interval_seconds) pairs: every command in CURL_FILE, or else CURL_STRINGS
+# from api_keys.py, [(curl_string, run_every_x_minutes), ...], defaulting to
+# CURL_STRING.
+def load_screens():
+    if CURL_FILE:
+        return [(screener_request(template), RUN_SCREENER_EVERY_X_MINUTES * 60) for template in load_curl_file(CURL_FILE)]
+    api_keys = load_api_keys()
+    curl_strings = getattr(api_keys, "CURL_STRINGS", None) or [(api_keys.CURL_STRING, RUN_SCREENER_EVERY_X_MINUTES)]
+    return [
+        (parse_curl_string_to_dict(curl_string), run_every_x_minutes * 60)
+        for curl_string, run_every_x_minutes in curl_strings
+    ]
 
 
 def say(msg):
@@ -99,54 +151,12 @@ def say(msg):
         os.system(f'say "{msg}"')
 
 
-# Returns a boolean of whether this qualifying option meets additional criteria.
-def is_high_quality_hit(opt, underlying_price):
-    # Parse values
-    trade_price = opt['trade.price']
-    ask_price = opt['ask']
-    strike = opt['strp']
-    volume = opt['ovol']
-    open_interest = opt['ooi']
-
-    # Derived metrics
-    oi_ratio = volume / open_interest if open_interest > 0 else 0
-
-    # How "out of the money" is this option?
-    if opt['otype'] == "CALL":
-        otm_percent = (strike - underlying_price) / underlying_price # calls
-    else:
-        otm_percent = (underlying_price - strike) / underlying_price # puts
-    opt['otm_percent'] = f"{otm_percent:.2%}"
-
-    ask_fill = trade_price >= 0.90 * ask_price  # near ask = aggressive buy
-
-
-
-    return (
-        oi_ratio >= 1.5 if oi_ratio else True and
-        trade_price < 1.00 and
-        otm_percent <= 0.05 and
-        ask_fill and
-        opt['total_premium'] and opt['total_premium'] > MIN_TOTAL_TRADE_SIZE_FOR_HQ_FILTER
-    )
-
-
-# Parses the dict for a hit into a short string message for notification.
-def format_msg_from_hit(hit):
-    return f"{hit['opt']}\ncurrent_share_price: {hit['sh_pr']}\notm_percentage: {hit['otm_perc']}\ndays_to_exp: {hit['exp']}\ntrade_price: {hit['trade_price']}\ntotal_cost: ${hit['t_prm']:,.0f}\ntotal_size: {hit['ovol']:,}\nhq_hit: {hit['hq_hit']}"
-
-
 # Sends a push notification for a given message.
 def send_sms_notification(msg):
     print(f"Sending notification for: {msg}")
-    url = "https://api.pushover.net/1/messages.json"
-    data = {
-        "token": PUSHOVER_APP_TOKEN,
-        "user": PUSHOVER_USER_KEY,
-        "message": msg,
-        "priority": 1,
-    }
-    response = requests.post(url, data=data)
+    with metrics.time("screener_stage_seconds", stage="notify"):
+        response = pushover_client.send(msg)
+    metrics.inc("screener_notifications_total", status=response.status_code)
     status_code_to_message = {
         200: "Notification sent successfully.",
         401: "Invalid access token.",
@@ -158,112 +168,364 @@ def send_sms_notification(msg):
     else:
         print(f"Error: {response.status_code}")
         print(response.text)
+    return response
 
 
+notification_dispatcher = NotificationDispatcher(
+    send=send_sms_notification,
+    format_hit=format_msg_from_hit,
+    queue_size=NOTIFICATION_QUEUE_SIZE,
+    coalesce_seconds=NOTIFICATION_COALESCE_SECONDS,
+    aggregator=HitAggregator(AGGREGATION_WINDOW_SECONDS, AGGREGATE_BY) if AGGREGATION_WINDOW_SECONDS is not None else None,
+    format_cluster=format_msg_from_cluster,
+)
+metrics.add_collector(notification_dispatcher.samples, kind="gauge")
+
+
+# Makes the Pushover client from the keys in api_keys.py and starts the
+# notification dispatcher. Called by each mode before it polls.
+def start_notifications():
+    global pushover_client
+    api_keys = load_api_keys()
+    pushover_client = PushoverClient(
+        api_keys.PUSHOVER_APP_TOKEN,
+        api_keys.PUSHOVER_USER_KEY,
+        pool_size=HTTP_POOL_SIZE,
+        timeout=HTTP_TIMEOUT,
+    )
+    notification_dispatcher.start()
+
+
+# Hands hits to the background notification dispatcher without waiting for
+# them to be sent.
 def send_notifications_for_hits(list_of_hits):
     if not list_of_hits:
         return
-    print(f"Sending notifications for {len(list_of_hits)} hits...")
+    print(f"Queueing notifications for {len(list_of_hits)} hits...")
     print(list_of_hits)
-    for hit in list_of_hits:
-        msg = format_msg_from_hit(hit)
-        send_sms_notification(msg)
-        time.sleep(5)
-
-
-def main():
-    parsed_curl_dict = parse_curl_string_to_dict(CURL_STRING)
-    cookies = parsed_curl_dict.pop("cookies")
-    headers = parsed_curl_dict.pop("headers")
-    url = parsed_curl_dict.pop("url")
-    query_params = parsed_curl_dict.pop("query_params")
-
-    options_already_seen_this_run = set()
-
-    while True:
-        if not TESTING:
-            response = requests.get(url, headers=headers, cookies=cookies, params=query_params)
-
-            if response.status_code == 401:
-                print(f"Error: {response.status_code}")
-                say("Re-authentication required.")
-                send_sms_notification("Re-authentication required.")
-                break
-
-            if response.status_code != 200:
-                print(f"Error: {response.status_code}")
-                say(f"Error occurred. Got status code {response.status_code}")
-                break
-
-            cookies.update(response.cookies.get_dict())
-
-        try:
-            data = mock_response if TESTING else response.json()
-        except json.JSONDecodeError:
-            print("Invalid JSON response")
-            break
-
-        print(f"Checking for hits at: {data['responseTime']}")
-
-        if "ScreenData" not in data:
-            say("No hits found.")
-
-        if "ScreenData" in data:
-            say("Unusual options trading activity found.")
-            print(data)
+    notification_dispatcher.submit(list_of_hits)
+
+
+# Returns the store of options already notified, preloaded with today's hits
+# from the hit history so a restart doesn't notify them again.
+def load_options_already_seen():
+    history = HitHistory(HIT_HISTORY_PATH) if HIT_HISTORY_PATH else None
+    options_already_seen = DedupStore(
+        max_keys=DEDUP_MAX_KEYS,
+        ttl_seconds=DEDUP_TTL_HOURS * 60 * 60,
+        reset_daily=DEDUP_RESET_DAILY,
+        history=history,
+    )
+    options_already_seen.load_history()
+    print(f"Loaded {len(options_already_seen)} options already notified today.")
+    return options_already_seen
+
+
+# Returns the PollScheduler settings from the constants above, overridden by
+# the schedule section of RULES_PATH. Testing mode screens the example
+# response on the fixed interval at any time, market open or not.
+def scheduler_settings():
+    if TESTING:
+        return {"min_interval_seconds": None, "max_interval_seconds": None, "sessions": None, "busy_windows": None}
+    adaptive = SCHEDULE.get("adaptive", ADAPTIVE_POLLING)
+    return {
+        "min_interval_seconds": SCHEDULE.get("min_poll_seconds", MIN_POLL_SECONDS) if adaptive else None,
+        "max_interval_seconds": SCHEDULE.get("max_poll_seconds", MAX_POLL_SECONDS) if adaptive else None,
+        "sessions": MARKET_SESSIONS if SCHEDULE.get("market_hours_only", MARKET_HOURS_ONLY) else None,
+        "busy_windows": BUSY_WINDOWS if adaptive else None,
+    }
 
-            list_of_hits = data.get("ScreenData", {}).get("underliers", [])
 
-            parsed_hits = []
-            for hit in list_of_hits:
-                underlying_price = clean_float(hit.get("price"))
-                for option in hit.get("options", []):
+# Returns the scheduler deciding when to poll a screen every interval_seconds.
+def make_scheduler(interval_seconds):
+    scheduler = PollScheduler(interval_seconds, **scheduler_settings())
+    schedulers.append(scheduler)
+    return scheduler
 
-                    # Convert string values to numbers.
-                    option = clean_option_object(option)
 
-                    # Filter out options in the returned chain with no activity.
-                    if not option["ovol"]:
-                        continue
+# Returns the ScreenDiffer tracking one screen's options between polls.
+def make_differ():
+    differ = ScreenDiffer()
+    screen_states.append(differ)
+    return differ
 
-                    # Calculate total price paid for the position.
-                    option['total_premium'] = option['trade.price'] * option['ovol'] * 100
 
-                    # Filter out smaller positions.
-                    if option['total_premium'] < MIN_TOTAL_TRADE_SIZE_FOR_DETECTION:
-                        continue
+# Returns the ResponseFingerprint of one screen's previous response.
+def make_fingerprint():
+    fingerprint = ResponseFingerprint()
+    screen_states.append(fingerprint)
+    return fingerprint
 
-                    # Filter out any options too far out.
-                    if option["exp"] > MAX_DAYS_TO_EXP:
-                        continue
 
-                    # Filter out any trade that isn't "buying to open" a position.
-                    trade_price_higher_than_ask = option["trade.price"] >= option["ask"]
-                    trade_volume_higher_than_oi = option["ovol"] > option["ooi"]
-                    if not trade_price_higher_than_ask and not trade_volume_higher_than_oi:
-                        continue
+# Applies RULES_PATH if it changed since it was last read. Called between
+# polls, so a poll never sees a mix of old and new settings. The new rules
+# and schedule replace the old ones at once, while connections, cookies and
+# the options already seen are kept. Every screen's differ and fingerprint are
+# reset, so the next poll screens every option under the new rules; the
+# options already seen keep it from repeating notifications. The screens
+# polled aren't reloaded: changes to CURL_FILE or CURL_STRINGS need a restart.
+def reload_config():
+    global RULES, SCHEDULE
+    config = config_watcher.poll() if config_watcher is not None else None
+    if config is None:
+        return
+    RULES, SCHEDULE = config.rules, config.schedule
+    for scheduler in schedulers:
+        scheduler.configure(**scheduler_settings())
+    for state in screen_states:
+        state.reset()
+    metrics.inc("screener_config_reloads_total")
+    print(f"Reloaded {RULES_PATH}.")
+
+
+# Screens a decoded screener response and returns the hits not already seen.
+# With a ScreenDiffer, only options that changed since the previous poll of the
+# same screen are checked.
+def find_hits(data, options_already_seen, differ=None):
+    print(f"Checking for hits at: {data['responseTime']}")
+    metrics.inc("screener_polls_total")
+
+    if "ScreenData" not in data:
+        say("No hits found.")
+        return []
+
+    say("Unusual options trading activity found.")
+    screen_data = data["ScreenData"]
+    print(f"Screen returned {screen_data.get('underliercount')} underliers and {screen_data.get('optionscount')} options.")
+
+    if differ is not None:
+        with metrics.time("screener_stage_seconds", stage="diff"):
+            delta = differ.diff(data)
+        print(f"Options since last poll: {delta.summary()}")
+        options, option_underliers = delta.options_to_screen()
+        return screen_option_list(options, option_underliers, options_already_seen, RULES, baselines, greeks)
+    return screen_options(data, options_already_seen, RULES, baselines, greeks)
+
+
+# Records hits in the hit history and hands them to the notification dispatcher.
+def handle_hits(hits, options_already_seen):
+    if options_already_seen.history is not None:
+        options_already_seen.history.record_hits(hits)
+    send_notifications_for_hits(hits)
+
+
+# Checks a decoded screener response for hits and sends notifications for them.
+# Returns the hits.
+def check_screen_data_for_hits(data, options_already_seen, differ=None):
+    parsed_hits = find_hits(data, options_already_seen, differ)
+    handle_hits(parsed_hits, options_already_seen)
+    return parsed_hits
 
-                    # Hash the option dict and add to set so we don't get notifications for the same qualifying option multiple times.
-                    option_hash = hash(f"{option['displaySymbol']}{option['trade.price']}{option['trade.time']}")
-                    if option_hash in options_already_seen_this_run:
-                        continue
-                    options_already_seen_this_run.add(option_hash)
 
-                    parsed_hits.append({
-                        "opt": option["displaySymbol"],
-                        "ovol": option["ovol"],
-                        "sh_pr": hit.get("price"),
-                        "exp": option.get("exp"),
-                        "t_prm": option.get("total_premium", 0),
-                        "trade_price": option.get("trade.price", 0),
-                        "hq_hit": is_high_quality_hit(option, underlying_price),
-                        "otm_perc": option.get("otm_percent", 0),
-                    })
+def main():
+    if TESTING:
+        from example_responses import example_response_1 as mock_response
+    parsed_curl_dict = parse_curl_string_to_dict(load_api_keys().CURL_STRING)
+    screener_client = ScreenerClient(
+        **parsed_curl_dict,
+        pool_size=HTTP_POOL_SIZE,
+        timeout=HTTP_TIMEOUT,
+    )
+    session_manager = SessionManager(
+        screener_client.session,
+        path=COOKIE_JAR_PATH,
+        keepalive=screener_client.keepalive,
+        keepalive_seconds=KEEPALIVE_MINUTES * 60 if KEEPALIVE_MINUTES else None,
+    )
+    if not TESTING:
+        session_manager.restore()
+        session_manager.start()
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    options_already_seen_this_run = load_options_already_seen()
+    differ = make_differ() if INCREMENTAL_SCREENING else None
+    scheduler = make_scheduler(RUN_SCREENER_EVERY_X_MINUTES * 60)
+    start_notifications()
+
+    recorder = ResponseRecorder(RECORD_RESPONSES_DIR) if RECORD_RESPONSES_DIR else None
+    if recorder is not None:
+        recorder.start()
+    # A streamed body is consumed by the parser, so recording needs the whole body.
+    stream = STREAM_RESPONSES and recorder is None
+    fingerprint = make_fingerprint()
 
-            send_notifications_for_hits(parsed_hits)
+    try:
+        while True:
+            scheduler.wait()
+            reload_config()
+            if not TESTING:
+                fetched_at = time.time()
+                response = screener_client.fetch(stream=stream)
+                print(f"Screener {screener_client.stats.summary()}")
+                if response is None:
+                    continue
+                if recorder is not None:
+                    recorder.record(response.content, fetched_at, response.elapsed.total_seconds(), response.status_code)
+
+                if response.status_code == 401:
+                    print(f"Error: {response.status_code}")
+                    say("Re-authentication required.")
+                    send_sms_notification("Re-authentication required. Paste a new cURL string into api_keys.py to resume.")
+                    response.close()
+                    parsed_curl_dict = wait_for_new_credentials(parsed_curl_dict["cookies"])
+                    session_manager.reseed(parsed_curl_dict["cookies"], parsed_curl_dict["url"])
+                    print("New credentials found, resuming.")
+                    continue
+
+                if response.status_code == 304 or (response.status_code == 200 and not stream and fingerprint.unchanged(response.content)):
+                    print("Screen unchanged since last poll, skipping.")
+                    metrics.inc("screener_short_circuited_polls_total")
+                    scheduler.record_poll(0)
+                    response.close()
+                    continue
+
+                if response.status_code != 200:
+                    print(f"Error: {response.status_code}")
+                    say(f"Error occurred. Got status code {response.status_code}")
+                    response.close()
+                    continue
+
+            # A streamed body is read while it is screened, so a broken one can
+            # fail either step; either way only this poll is skipped.
+            try:
+                with metrics.time("screener_stage_seconds", stage="decode"):
+                    data = mock_response if TESTING else read_response(response, stream=stream)
+                hits = check_screen_data_for_hits(data, options_already_seen_this_run, differ)
+            except json.JSONDecodeError:
+                print("Invalid JSON response")
+                metrics.inc("screener_invalid_responses_total")
+                response.close()
+                continue
+            except READ_ERRORS as e:
+                print(f"Error reading response: {e}")
+                metrics.inc("screener_invalid_responses_total")
+                response.close()
+                continue
+            scheduler.record_poll(len(hits), data.get("responseTime"))
+            if not TESTING:
+                response.close()
+    except KeyboardInterrupt:
+        pass
+
+    # Let any queued notifications go out and recordings be written before exiting.
+    session_manager.stop()
+    notification_dispatcher.stop(timeout=60)
+    if recorder is not None:
+        recorder.stop(timeout=60)
+
+
+# Polls every screen in CURL_FILE or CURL_STRINGS concurrently, sharing one
+# connection pool and one set of already-seen options.
+def main_concurrent():
+    import asyncio
+    from async_runner import run_screens
+
+    screens = load_screens()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    options_already_seen_this_run = load_options_already_seen()
+    differs = {}  # screen name -> ScreenDiffer
+    start_notifications()
+
+    recorder = ResponseRecorder(RECORD_RESPONSES_DIR) if RECORD_RESPONSES_DIR else None
+    if recorder is not None:
+        recorder.start()
+
+    def process_data(name, data):
+        if INCREMENTAL_SCREENING and name not in differs:
+            differs[name] = make_differ()
+        return check_screen_data_for_hits(data, options_already_seen_this_run, differs.get(name))
+
+    def on_auth_required(name):
+        say("Re-authentication required.")
+        send_sms_notification(f"Re-authentication required for {name}.")
 
-        time.sleep(RUN_SCREENER_EVERY_X_MINUTES * 60)
+    try:
+        asyncio.run(run_screens(
+            screens,
+            process_data=process_data,
+            on_auth_required=on_auth_required,
+            timeout=HTTP_TIMEOUT,
+            recorder=recorder,
+            make_scheduler=make_scheduler,
+            make_fingerprint=make_fingerprint,
+            on_tick=reload_config,
+            cookie_jar_path=COOKIE_JAR_PATH,
+            keepalive_seconds=KEEPALIVE_MINUTES * 60 if KEEPALIVE_MINUTES else None,
+        ))
+    except KeyboardInterrupt:
+        pass
+
+    # Let any queued notifications go out and recordings be written before exiting.
+    notification_dispatcher.stop(timeout=60)
+    if recorder is not None:
+        recorder.stop(timeout=60)
+
+
+# Polls the screens in CURL_FILE or CURL_STRINGS split across every account
+# in ACCOUNT_CURL_STRINGS, one worker process per account, with hits from all
+# of them merged into one deduplicated notification stream.
+def main_sharded():
+    from supervisor import Supervisor
+
+    screens = load_screens()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    options_already_seen_this_run = load_options_already_seen()
+    start_notifications()
+
+    def on_auth_required(account, name):
+        say("Re-authentication required.")
+        send_sms_notification(f"Re-authentication required for account {account} ({name}).")
+
+    supervisor = Supervisor(
+        accounts=load_accounts(),
+        screens=screens,
+        interval_seconds=RUN_SCREENER_EVERY_X_MINUTES * 60,
+        find_hits=find_hits,
+        handle_hits=handle_hits,
+        on_auth_required=on_auth_required,
+        make_scheduler=make_scheduler,
+        make_differ=make_differ,
+        make_fingerprint=make_fingerprint,
+        on_tick=reload_config,
+        options_already_seen=options_already_seen_this_run,
+        load_accounts=load_accounts,
+        incremental=INCREMENTAL_SCREENING,
+        timeout=HTTP_TIMEOUT,
+        cookie_jar_path=COOKIE_JAR_PATH,
+        keepalive_seconds=KEEPALIVE_MINUTES * 60 if KEEPALIVE_MINUTES else None,
+    )
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        pass
+
+    # Let any queued notifications go out before exiting.
+    notification_dispatcher.stop(timeout=60)
+
+
+# Command-line entry point. The mode defaults to the one SHARD_ACROSS_ACCOUNTS
+# and POLL_SCREENS_CONCURRENTLY select; each mode imports only the modules it
+# runs on (asyncio for concurrent, multiprocessing for sharded, the example
+# response for --test), so startup stays quick.
+def cli(argv=None):
+    global TESTING, CURL_FILE
+    default_mode = "sharded" if SHARD_ACROSS_ACCOUNTS else "concurrent" if POLL_SCREENS_CONCURRENTLY else "single"
+    parser = argparse.ArgumentParser(description="Poll ETRADE option screens and notify on unusual trades.")
+    parser.add_argument("--mode", choices=("single", "concurrent", "sharded"), default=default_mode,
+                        help=f"poll CURL_STRING, every screen concurrently, or the screens sharded across accounts (default: {default_mode})")
+    parser.add_argument("--test", action="store_true", default=TESTING,
+                        help="screen the bundled example response instead of polling ETRADE (single mode)")
+    parser.add_argument("--curl-file", default=CURL_FILE,
+                        help="file of 'Copy as cURL' commands, one per screen, to poll instead of CURL_STRINGS (concurrent and sharded modes)")
+    args = parser.parse_args(argv)
+
+    TESTING = args.test
+    CURL_FILE = args.curl_file
+    {"single": main, "concurrent": main_concurrent, "sharded": main_sharded}[args.mode]()
 
 
 if __name__ == "__main__":
-    main()
+    cli()
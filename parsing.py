@@ -0,0 +1,100 @@
+import re
+
+import numpy as np
+
+
+# ETRADE sends every number as a string, e.g. '15,723,554,319.00', '--', 'NaN'
+# or ''. These helpers turn them into ints/floats, either one at a time or a
+# whole column at once. The column parsers are the fast path, used by
+# screening.flatten_options(); clean_int() and clean_float() are for single
+# values and fallbacks, and are barely faster than the regexes they replaced.
+
+MISSING_VALUES = ['--', 'NaN']
+
+# Translation tables deleting every ASCII character the regexes below would
+# remove. For ASCII input, str.translate() gives the same result as re.sub().
+_INT_DELETE = {i: None for i in range(128) if not chr(i).isdigit()}
+_FLOAT_DELETE = {i: None for i in range(128) if not (chr(i).isdigit() or chr(i) in '.-')}
+
+# Column parsing joins values with a separator that the tables must keep.
+_COLUMN_SEPARATOR = '\n'
+_FIELD_JOINER = _COLUMN_SEPARATOR + '0'
+_INT_COLUMN_DELETE = {i: None for i in _INT_DELETE if chr(i) != _COLUMN_SEPARATOR}
+_FLOAT_COLUMN_DELETE = {i: None for i in _FLOAT_DELETE if chr(i) != _COLUMN_SEPARATOR}
+
+
+def _clean_int_slow(val):
+    try:
+        return int(re.sub(r'[^\d]', '', val))  # removes commas and non-digits
+    except ValueError:
+        return 0
+
+
+def _clean_float_slow(val):
+    try:
+        return float(re.sub(r'[^\d.\-]', '', val))
+    except ValueError:
+        return 0.0
+
+
+def clean_int(val):
+    val = str(val).strip()
+    if not val or val in MISSING_VALUES:
+        return 0
+    if not val.isascii():
+        return _clean_int_slow(val)
+    val = val.translate(_INT_DELETE)
+    return int(val) if val else 0
+
+
+def clean_float(val):
+    val = str(val).strip()
+    if not val or val in MISSING_VALUES:
+        return 0.0
+    if not val.isascii():
+        return _clean_float_slow(val)
+    try:
+        return float(val.translate(_FLOAT_DELETE))
+    except ValueError:
+        return 0.0
+
+
+# Splits a column of values into cleaned ASCII fields with a single translate()
+# pass over the joined column. Each field is prefixed with '0' so empty fields
+# parse as zero without a per-field check; a leading zero never changes the
+# value int() or float() parse. Returns None if the column can't take the fast
+# path (non-ASCII text, or values containing the separator).
+def _translate_column(values, delete_table):
+    try:
+        text = '0' + _FIELD_JOINER.join(values)
+    except TypeError:
+        text = '0' + _FIELD_JOINER.join(map(str, values))
+    if not text.isascii():
+        return None
+    fields = text.translate(delete_table).split(_COLUMN_SEPARATOR)
+    if len(fields) != len(values):
+        return None
+    return fields
+
+
+# Parses a sequence of values into an int64 array with clean_int() semantics.
+def parse_int_column(values):
+    if not values:
+        return np.zeros(0, dtype=np.int64)
+    fields = _translate_column(values, _INT_COLUMN_DELETE)
+    if fields is None:
+        return np.array([clean_int(val) for val in values], dtype=np.int64)
+    return np.array(list(map(int, fields)), dtype=np.int64)
+
+
+# Parses a sequence of values into a float64 array with clean_float() semantics.
+def parse_float_column(values):
+    if not values:
+        return np.zeros(0, dtype=np.float64)
+    fields = _translate_column(values, _FLOAT_COLUMN_DELETE)
+    if fields is not None:
+        try:
+            return np.array(list(map(float, fields)), dtype=np.float64)
+        except ValueError:
+            pass  # e.g. '--', a negative number or '1.2.3'; fall back to per-value parsing.
+    return np.array([clean_float(val) for val in values], dtype=np.float64)
@@ -0,0 +1,144 @@
+import bisect
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+INDEX_FILENAME = "index.tsv"
+DEFAULT_ROTATE_BYTES = 64 * 1024 * 1024  # start a new archive after this many compressed bytes
+DEFAULT_QUEUE_SIZE = 100  # responses waiting to be written
+
+
+def _compress(data):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data)
+
+
+def _decompress(data, archive_name):
+    if archive_name.endswith(".zst"):
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+# Returns every line of an archive. Each record is its own gzip member or zstd
+# frame, so the archive is also a valid .gz/.zst file of JSON lines.
+def read_archive_lines(path):
+    if path.endswith(".zst"):
+        with open(path, "rb") as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            data = reader.read()
+    else:
+        with gzip.open(path, "rb") as f:
+            data = f.read()
+    return [line for line in data.splitlines() if line.strip()]
+
+
+# Appends raw screener responses to a rotating, compressed archive of JSON
+# lines from a background thread, so recording adds no latency to polling.
+#
+# Each line is {"fetched_at": ..., "latency": ..., "status": ..., "body": ...}.
+# Every record is compressed on its own, and index.tsv lists each record's
+# fetch time, archive and byte range, so any record can be read back by
+# timestamp without decompressing the archive around it.
+class ResponseRecorder:
+    def __init__(self, directory, rotate_bytes=DEFAULT_ROTATE_BYTES, queue_size=DEFAULT_QUEUE_SIZE):
+        self.directory = directory
+        self.rotate_bytes = rotate_bytes
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._archive = None
+        self._archive_name = None
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+            self._thread.start()
+
+    # Waits up to timeout seconds for queued responses to be written, then stops.
+    def stop(self, timeout=None):
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Queues a raw response body for writing without blocking.
+    def record(self, body, fetched_at, latency, status):
+        try:
+            self.queue.put_nowait((body, fetched_at, latency, status))
+        except queue.Full:
+            self.dropped += 1
+            print("Response recorder queue full, dropping response.")
+
+    def _open_archive(self, fetched_at):
+        if self._archive is not None:
+            self._archive.close()
+        extension = "zst" if zstandard is not None else "gz"
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(fetched_at))
+        self._archive_name = f"responses-{stamp}.jsonl.{extension}"
+        self._archive = open(os.path.join(self.directory, self._archive_name), "ab")
+
+    def _write(self, body, fetched_at, latency, status):
+        if self._archive is None or self._archive.tell() >= self.rotate_bytes:
+            self._open_archive(fetched_at)
+
+        line = json.dumps({
+            "fetched_at": fetched_at,
+            "latency": latency,
+            "status": status,
+            "body": body.decode("utf-8", errors="replace"),
+        }).encode() + b"\n"
+        compressed = _compress(line)
+
+        offset = self._archive.tell()
+        self._archive.write(compressed)
+        self._archive.flush()
+        with open(os.path.join(self.directory, INDEX_FILENAME), "a") as index:
+            index.write(f"{fetched_at:.3f}\t{self._archive_name}\t{offset}\t{len(compressed)}\n")
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                self._write(*item)
+            except OSError as e:
+                print(f"Error recording response: {e}")
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+
+# Returns the index of a recording directory as a list of
+# (fetched_at, archive_name, offset, length), sorted by fetch time.
+def load_index(directory):
+    entries = []
+    with open(os.path.join(directory, INDEX_FILENAME)) as index:
+        for line in index:
+            fetched_at, archive_name, offset, length = line.rstrip("\n").split("\t")
+            entries.append((float(fetched_at), archive_name, int(offset), int(length)))
+    entries.sort()
+    return entries
+
+
+# Returns the recorded response fetched at or most recently before timestamp,
+# as the dict written by ResponseRecorder, or None if there isn't one.
+def read_recording_at(directory, timestamp, index=None):
+    index = index if index is not None else load_index(directory)
+    position = bisect.bisect_right([fetched_at for fetched_at, _, _, _ in index], timestamp) - 1
+    if position < 0:
+        return None
+    _, archive_name, offset, length = index[position]
+    with open(os.path.join(directory, archive_name), "rb") as f:
+        f.seek(offset)
+        return json.loads(_decompress(f.read(length), archive_name))
@@ -0,0 +1,97 @@
+from dedup import option_key
+
+
+def _round(value, digits):
+    return None if value is None else round(value, digits)
+
+
+# Compact, typed record for one screened option. Built once from the parsed
+# columns, with the derived metrics the filters compute (total premium, OTM
+# percent, buy-to-open and high-quality flags) stored alongside the raw values.
+# __slots__ keeps each record a fraction of the size of the equivalent dict.
+class OptionRecord:
+    __slots__ = (
+        'symbol',
+        'display_symbol',
+        'underlying_symbol',
+        'is_call',
+        'trade_price',
+        'trade_time',
+        'ovol',
+        'ooi',
+        'ask',
+        'bid',
+        'strike',
+        'exp',
+        'underlying_price',
+        'underlying_price_text',  # as ETRADE sent it, for display
+        'total_premium',
+        'otm_percent',
+        'buy_to_open',
+        'hq_hit',
+        'volume_zscore',  # the rolling-baseline measures, see baselines.py
+        'acceleration',
+        'underlier_zscore',
+        'anomaly_score',
+        'implied_volatility',  # see greeks.py; None until enriched or if unsolvable
+        'delta',
+        'gamma',
+    )
+
+    def __init__(self, symbol, display_symbol, underlying_symbol, is_call, trade_price, trade_time, ovol, ooi, ask, bid,
+                 strike, exp, underlying_price, underlying_price_text, total_premium, otm_percent, buy_to_open, hq_hit,
+                 volume_zscore=0.0, acceleration=1.0, underlier_zscore=0.0, anomaly_score=0.0,
+                 implied_volatility=None, delta=None, gamma=None):
+        self.symbol = symbol
+        self.display_symbol = display_symbol
+        self.underlying_symbol = underlying_symbol
+        self.is_call = is_call
+        self.trade_price = trade_price
+        self.trade_time = trade_time
+        self.ovol = ovol
+        self.ooi = ooi
+        self.ask = ask
+        self.bid = bid
+        self.strike = strike
+        self.exp = exp
+        self.underlying_price = underlying_price
+        self.underlying_price_text = underlying_price_text
+        self.total_premium = total_premium
+        self.otm_percent = otm_percent
+        self.buy_to_open = buy_to_open
+        self.hq_hit = hq_hit
+        self.volume_zscore = volume_zscore
+        self.acceleration = acceleration
+        self.underlier_zscore = underlier_zscore
+        self.anomaly_score = anomaly_score
+        self.implied_volatility = implied_volatility
+        self.delta = delta
+        self.gamma = gamma
+
+    # Stable key for dedup, see dedup.option_key().
+    @property
+    def key(self):
+        return option_key(self.symbol, self.trade_price, self.trade_time)
+
+    # Returns the record as the hit dict printed and stored before records
+    # existed, plus the fields needed to identify the trade.
+    def to_dict(self):
+        return {
+            "opt": self.display_symbol,
+            "symbol": self.symbol,
+            "trade_time": self.trade_time,
+            "ovol": self.ovol,
+            "sh_pr": self.underlying_price_text,
+            "exp": self.exp,
+            "t_prm": self.total_premium,
+            "trade_price": self.trade_price,
+            "hq_hit": self.hq_hit,
+            "otm_perc": f"{self.otm_percent:.2%}",
+            "anomaly_score": round(self.anomaly_score, 2),
+            "iv": _round(self.implied_volatility, 4),
+            "delta": _round(self.delta, 4),
+            "gamma": _round(self.gamma, 4),
+        }
+
+    def __repr__(self):
+        return f"OptionRecord({self.to_dict()})"
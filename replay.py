@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+# Replays recorded screener responses through the parse, filter, dedup and
+# format pipeline as fast as possible, with notifications stubbed out, and
+# reports throughput, per-stage latency percentiles and peak memory.
+#
+# Usage: ./replay.py example_responses.py [more files or directories] [--repeat N] [--full] [--rules RULES_PATH]
+#
+# Accepts Python modules of response dicts (like example_responses.py), .json
+# files holding one response, .jsonl files holding one response per line,
+# archives written by the response recorder, and directories of any of these.
+
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+from baselines import BaselineStore
+from config import ScreenerConfig
+from dedup import DedupStore
+from diffing import ScreenDiffer
+from messages import format_msg_from_hit
+from recorder import read_archive_lines
+from rules import Rules, default_rules_config
+from screening import screen_option_list, screen_options
+from streaming import loads
+
+STAGES = ["decode", "diff", "screen", "format"]
+
+
+def _load_module_responses(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return [
+        value for _, value in sorted(vars(module).items())
+        if isinstance(value, dict) and "responseTime" in value
+    ]
+
+
+# Returns the raw JSON bodies of every recorded response under paths, in order.
+# The recorder archives every response, so only its 200s are replayed, not
+# empty 304s or error pages.
+def load_bodies(paths):
+    bodies = []
+    for path in paths:
+        if os.path.isdir(path):
+            children = [os.path.join(path, child) for child in sorted(os.listdir(path))]
+            bodies.extend(load_bodies([child for child in children if os.path.isfile(child)]))
+        elif path.endswith(".py"):
+            bodies.extend(json.dumps(response).encode() for response in _load_module_responses(path))
+        elif path.endswith((".jsonl.gz", ".jsonl.zst")):
+            records = (json.loads(line) for line in read_archive_lines(path))
+            bodies.extend(record["body"].encode() for record in records if record.get("status", 200) == 200)
+        elif path.endswith(".jsonl"):
+            with open(path, "rb") as f:
+                bodies.extend(line for line in f if line.strip())
+        elif path.endswith(".json"):
+            with open(path, "rb") as f:
+                bodies.append(f.read())
+    return bodies
+
+
+# Returns the process's peak resident memory in bytes.
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KB
+
+
+# Pushes every body through the pipeline repeat times. Returns the per-stage
+# latencies in seconds and the hit and option counts.
+def replay(bodies, repeat, rules, format_hit, incremental, anomaly_scoring=False, compute_greeks=False):
+    options_already_seen = DedupStore()
+    differ = ScreenDiffer() if incremental else None
+    baselines = BaselineStore() if anomaly_scoring else None
+    greeks = None
+    if compute_greeks:
+        from greeks import GreeksCalculator
+        greeks = GreeksCalculator()
+    latencies = {stage: [] for stage in STAGES}
+    hits = 0
+    options = 0
+
+    for _ in range(repeat):
+        for body in bodies:
+            start = time.perf_counter()
+            data = loads(body)
+            decoded = time.perf_counter()
+            latencies["decode"].append(decoded - start)
+
+            if "ScreenData" not in data:
+                continue
+            for underlier in data["ScreenData"].get("underliers", []):
+                options += len(underlier.get("options", []))
+
+            if differ is not None:
+                delta = differ.diff(data)
+                diffed = time.perf_counter()
+                latencies["diff"].append(diffed - decoded)
+                option_list, option_underliers = delta.options_to_screen()
+                parsed_hits = screen_option_list(option_list, option_underliers, options_already_seen, rules, baselines, greeks)
+            else:
+                diffed = decoded
+                parsed_hits = screen_options(data, options_already_seen, rules, baselines, greeks)
+            screened = time.perf_counter()
+            latencies["screen"].append(screened - diffed)
+
+            for hit in parsed_hits:
+                format_hit(hit)
+            latencies["format"].append(time.perf_counter() - screened)
+            hits += len(parsed_hits)
+
+    return latencies, hits, options
+
+
+def print_report(latencies, hits, options, elapsed, responses):
+    print(f"Replayed {responses:,} responses with {options:,} options in {elapsed:.3f}s: "
+          f"{options / elapsed:,.0f} options/s, {hits:,} hits")
+    print(f"{'stage':<8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  (ms)")
+    for stage in STAGES:
+        samples = latencies[stage]
+        if not samples:
+            continue
+        p50, p90, p99, worst = np.percentile(np.array(samples) * 1000, [50, 90, 99, 100])
+        print(f"{stage:<8} {p50:9.3f} {p90:9.3f} {p99:9.3f} {worst:9.3f}")
+    print(f"Peak memory (RSS): {peak_rss_bytes() / 1024 / 1024:.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded screener responses through the screening pipeline.")
+    parser.add_argument("paths", nargs="+", help="recorded responses: .py, .json, .jsonl, .jsonl.gz/.zst files or directories")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the responses this many times")
+    parser.add_argument("--rules", metavar="RULES_PATH",
+                        help="JSON or YAML rules file to screen with, like RULES_PATH (default: the built-in thresholds)")
+    parser.add_argument("--full", action="store_true", help="screen every option each poll rather than only the ones that changed")
+    parser.add_argument("--fail-below", type=float, metavar="OPTIONS_PER_SECOND",
+                        help="exit with an error if throughput falls below this, for regression checks")
+    args = parser.parse_args()
+
+    # Screens as options_screener.py does by default: incrementally, with
+    # anomaly scoring and greeks.
+    rules = ScreenerConfig.from_file(args.rules).rules if args.rules else Rules.from_config(default_rules_config())
+    bodies = load_bodies(args.paths)
+    if not bodies:
+        sys.exit("No recorded responses found.")
+
+    start = time.perf_counter()
+    latencies, hits, options = replay(
+        bodies, args.repeat, rules, format_msg_from_hit,
+        incremental=not args.full,
+        anomaly_scoring=True,
+        compute_greeks=True,
+    )
+    elapsed = time.perf_counter() - start
+    print_report(latencies, hits, options, elapsed, len(bodies) * args.repeat)
+    print(rules.report())
+
+    if args.fail_below and options / elapsed < args.fail_below:
+        sys.exit(f"Throughput {options / elapsed:,.0f} options/s is below {args.fail_below:,.0f} options/s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import json
+import operator
+
+import numpy as np
+
+from metrics import metrics
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Columns every rule can read at no extra cost: parsed by
+# screening.flatten_options() or derived by screening.derive_columns().
+BASE_FIELDS = (
+    'ovol', 'ooi', 'trade.price', 'trade.time', 'ask', 'strp', 'exp',
+    'is_call', 'underlying_price', 'total_premium', 'otm_percent', 'buy_to_open',
+)
+
+
+def _oi_ratio(columns):
+    open_interest = columns['ooi']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(open_interest > 0, columns['ovol'] / np.where(open_interest > 0, open_interest, 1), 0.0)
+
+
+# Trade price as a fraction of the ask. A missing ask counts as filled.
+def _ask_fill_ratio(columns):
+    ask = columns['ask']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ask > 0, columns['trade.price'] / np.where(ask > 0, ask, 1), np.inf)
+
+
+def _zeros(columns):
+    return np.zeros(len(columns['ovol']))
+
+
+def _ones(columns):
+    return np.ones(len(columns['ovol']))
+
+
+# Columns computed the first time a rule reads them. The baseline measures are
+# filled in by screening when it is given a BaselineStore, and otherwise read
+# as 0, or 1 for acceleration (a steady rate).
+DERIVED_FIELDS = {
+    'oi_ratio': _oi_ratio,
+    'ask_fill_ratio': _ask_fill_ratio,
+    'volume_zscore': _zeros,
+    'acceleration': _ones,
+    'underlier_zscore': _zeros,
+    'anomaly_score': _zeros,
+}
+DERIVED_FIELD_COST = 3  # relative to reading a base field
+
+TUNE_EVERY_EVALUATIONS = 100  # re-order rules by observed selectivity this often
+
+# Keys every rule needs: {"name": ..., "field": ..., "op": ..., "value": ...}.
+# "zero_passes": true additionally lets options where the field is 0 pass,
+# e.g. an oi_ratio of 0 when there is no open interest to compare against.
+RULE_KEYS = {"name", "field", "op", "value"}
+
+
+class Rule:
+    __slots__ = ('name', 'field', 'op', 'value', 'zero_passes', 'cost', 'evaluated', 'passed')
+
+    def __init__(self, name, field, op, value, zero_passes=False):
+        if field not in BASE_FIELDS and field not in DERIVED_FIELDS:
+            raise ValueError(f"Rule {name!r}: unknown field {field!r}.")
+        if op not in OPERATORS:
+            raise ValueError(f"Rule {name!r}: unknown operator {op!r}, expected one of {', '.join(OPERATORS)}.")
+        self.name = name
+        self.field = field
+        self.op = OPERATORS[op]
+        self.value = value
+        self.zero_passes = zero_passes
+        self.cost = DERIVED_FIELD_COST if field in DERIVED_FIELDS else 1
+        self.evaluated = 0
+        self.passed = 0
+
+    # Fraction of the options reaching this rule that passed it, or None
+    # before it has seen any.
+    @property
+    def pass_rate(self):
+        return self.passed / self.evaluated if self.evaluated else None
+
+    # Expected cost of the rule per option it removes. Rules with the lowest
+    # rank run first: cheap rules that reject most options.
+    def rank(self):
+        pass_rate = self.pass_rate
+        if pass_rate is None:
+            pass_rate = 0.5
+        return self.cost / max(1 - pass_rate, 1e-6)
+
+
+# An ordered list of rules an option must all pass. Rules run one at a time
+# over only the rows that passed the rules before them, so putting the most
+# selective rules first leaves the rest less to do. The order starts cheapest
+# first and, with reorder on, is re-tuned from each rule's observed pass rate
+# every TUNE_EVERY_EVALUATIONS evaluations.
+class RuleSet:
+    def __init__(self, rules, reorder=True, rejections_metric=None):
+        self.rules = sorted(rules, key=lambda rule: rule.cost)
+        self.reorder = reorder
+        self.rejections_metric = rejections_metric
+        self.evaluations = 0
+
+    @classmethod
+    def from_config(cls, config, reorder=True, rejections_metric=None):
+        rules = []
+        for entry in config:
+            missing = RULE_KEYS - set(entry)
+            if missing:
+                raise ValueError(f"Rule {entry.get('name', entry)!r} is missing {', '.join(sorted(missing))}.")
+            rules.append(Rule(entry["name"], entry["field"], entry["op"], entry["value"], entry.get("zero_passes", False)))
+        return cls(rules, reorder, rejections_metric)
+
+    # Returns the indices of the rows, out of rows (every row by default), that
+    # pass every rule.
+    def evaluate(self, columns, rows=None):
+        if rows is None:
+            rows = np.arange(len(columns['ovol']))
+        rejected = {}
+        for rule in self.rules:
+            if not len(rows):
+                break
+            column = columns.get(rule.field)
+            if column is None:
+                column = columns[rule.field] = DERIVED_FIELDS[rule.field](columns)
+            values = column[rows]
+            passes = rule.op(values, rule.value)
+            if rule.zero_passes:
+                passes |= values == 0
+            passing_rows = rows[passes]
+            rule.evaluated += len(rows)
+            rule.passed += len(passing_rows)
+            rejected[rule.name] = len(rows) - len(passing_rows)
+            rows = passing_rows
+
+        if self.rejections_metric is not None:
+            for name, count in rejected.items():
+                metrics.inc(self.rejections_metric, count, rule=name)
+
+        self.evaluations += 1
+        if self.reorder and self.evaluations % TUNE_EVERY_EVALUATIONS == 0:
+            self.tune()
+        return rows
+
+    # Re-orders the rules by rank().
+    def tune(self):
+        self.rules.sort(key=Rule.rank)
+
+    # Returns a table of each rule's observed selectivity, in evaluation order.
+    def report(self):
+        lines = [f"{'rule':<20} {'evaluated':>10} {'passed':>10} {'pass rate':>10}"]
+        for rule in self.rules:
+            pass_rate = "-" if rule.pass_rate is None else f"{rule.pass_rate:.1%}"
+            lines.append(f"{rule.name:<20} {rule.evaluated:>10,} {rule.passed:>10,} {pass_rate:>10}")
+        return "\n".join(lines)
+
+
+# The compiled rules: detection decides which options are hits, and
+# high_quality which of those hits are flagged as high quality.
+class Rules:
+    def __init__(self, detection, high_quality):
+        self.detection = detection
+        self.high_quality = high_quality
+
+    # Compiles a rules config: "detection" and "high_quality" lists of rules,
+    # or a "thresholds" dict of default_rules_config() arguments instead.
+    @classmethod
+    def from_config(cls, config):
+        if "detection" not in config and "thresholds" in config:
+            config = dict(config, **default_rules_config(**config["thresholds"]))
+        reorder = config.get("reorder", True)
+        return cls(
+            detection=RuleSet.from_config(config["detection"], reorder, "screener_filter_rejections_total"),
+            high_quality=RuleSet.from_config(config.get("high_quality", []), reorder),
+        )
+
+    def report(self):
+        return f"Detection rules:\n{self.detection.report()}\nHigh-quality rules:\n{self.high_quality.report()}"
+
+    # Counter samples for the metrics endpoint, see Metrics.add_collector().
+    def samples(self):
+        for group, rule_set in (("detection", self.detection), ("high_quality", self.high_quality)):
+            for rule in rule_set.rules:
+                yield "screener_rule_evaluated_total", {"group": group, "rule": rule.name}, rule.evaluated
+                yield "screener_rule_passed_total", {"group": group, "rule": rule.name}, rule.passed
+
+
+# Returns the rules config matching the screener's original hardcoded filters,
+# with the thresholds given, by default the original ones.
+def default_rules_config(min_total_trade_size=1000, min_total_trade_size_for_hq=1000, max_days_to_exp=40):
+    return {
+        "detection": [
+            {"name": "volume", "field": "ovol", "op": "!=", "value": 0},
+            {"name": "total_premium", "field": "total_premium", "op": ">=", "value": min_total_trade_size},
+            {"name": "days_to_exp", "field": "exp", "op": "<=", "value": max_days_to_exp},
+            {"name": "buy_to_open", "field": "buy_to_open", "op": "==", "value": True},
+        ],
+        "high_quality": [
+            {"name": "oi_ratio", "field": "oi_ratio", "op": ">=", "value": 1.5, "zero_passes": True},
+            {"name": "cheap_contract", "field": "trade.price", "op": "<", "value": 1.00},
+            {"name": "near_the_money", "field": "otm_percent", "op": "<=", "value": 0.05},
+            {"name": "ask_fill", "field": "ask_fill_ratio", "op": ">=", "value": 0.90},
+            {"name": "hq_total_premium", "field": "total_premium", "op": ">", "value": min_total_trade_size_for_hq},
+        ],
+    }
+
+
+# Returns the contents of a JSON or (with PyYAML installed) YAML file. PyYAML
+# is only imported for YAML files, since it is slow to import.
+def read_config_file(path):
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is needed to read YAML rules files: pip install pyyaml") from None
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+# Loads and compiles a rules file.
+def load_rules(path):
+    return Rules.from_config(read_config_file(path))
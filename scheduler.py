@@ -0,0 +1,141 @@
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from datetime import time as clock_time
+
+from dedup import MARKET_TIMEZONE
+from metrics import metrics
+
+# Regular trading session, New York time.
+MARKET_SESSIONS = ((clock_time(9, 30), clock_time(16, 0)),)
+# Opening and closing bursts, polled at the minimum interval.
+BUSY_WINDOWS = ((clock_time(9, 30), clock_time(10, 0)), (clock_time(15, 30), clock_time(16, 0)))
+TRADING_WEEKDAYS = (0, 1, 2, 3, 4)  # Monday to Friday; market holidays aren't skipped
+
+RECENT_POLLS = 5  # polls considered when judging the recent hit rate
+TIGHTEN_FACTOR = 0.5  # interval multiplier after a poll with hits
+RELAX_FACTOR = 1.5  # interval multiplier after stale polls or a quiet stretch
+
+
+# Parses a screener responseTime such as 'April 16, 2025 15:03:28 PM EDT' into
+# a timestamp, or returns None if it isn't in that format. The hour is already
+# 24-hour, so the AM/PM marker and zone name are ignored.
+def parse_response_time(text):
+    try:
+        moment = datetime.strptime(text.rsplit(" ", 2)[0], "%B %d, %Y %H:%M:%S")
+    except (AttributeError, ValueError):
+        return None
+    return moment.replace(tzinfo=MARKET_TIMEZONE).timestamp()
+
+
+def _in_window(moment, windows):
+    return any(start <= moment.time() < end for start, end in windows)
+
+
+# Decides when to poll a screen. Polls run on fixed-rate ticks, each one
+# interval after the previous tick rather than after the previous poll
+# finished, so fetch and processing time don't stretch the period. Ticks
+# missed because a poll overran are skipped rather than run back to back.
+#
+# Outside sessions (market-local (start, end) times on weekdays) polling is
+# suspended until the next session opens; pass sessions=None to poll around
+# the clock. During busy_windows the minimum interval is used. Otherwise the
+# interval tightens after polls with hits, and relaxes towards the maximum
+# after RECENT_POLLS polls without any, or when the screener returns the same
+# responseTime as the previous poll (its data hasn't refreshed yet).
+class PollScheduler:
+    def __init__(self, interval_seconds, min_interval_seconds=None, max_interval_seconds=None,
+                 sessions=MARKET_SESSIONS, busy_windows=BUSY_WINDOWS, weekdays=TRADING_WEEKDAYS, clock=time.time):
+        self.base_interval = interval_seconds
+        self.interval = interval_seconds
+        self.weekdays = weekdays
+        self.clock = clock
+        self.skipped_ticks = 0
+        self._next_tick = None
+        self._recent_hits = deque(maxlen=RECENT_POLLS)
+        self._last_response_time = None
+        self.configure(min_interval_seconds, max_interval_seconds, sessions, busy_windows)
+
+    # Changes the interval bounds, sessions and busy windows, taking effect
+    # from the next tick. The current interval is clamped to the new bounds.
+    def configure(self, min_interval_seconds=None, max_interval_seconds=None, sessions=MARKET_SESSIONS, busy_windows=BUSY_WINDOWS):
+        self.min_interval = min_interval_seconds or self.base_interval
+        self.max_interval = max_interval_seconds or self.base_interval
+        self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+        self.sessions = sessions
+        self.busy_windows = busy_windows or ()
+
+    # Returns whether timestamp falls within a session.
+    def in_session(self, timestamp):
+        if self.sessions is None:
+            return True
+        moment = datetime.fromtimestamp(timestamp, MARKET_TIMEZONE)
+        return moment.weekday() in self.weekdays and _in_window(moment, self.sessions)
+
+    # Returns timestamp if it is within a session, else when the next session opens.
+    def next_session_open(self, timestamp):
+        if self.in_session(timestamp):
+            return timestamp
+        day = datetime.fromtimestamp(timestamp, MARKET_TIMEZONE).date()
+        for offset in range(8):
+            date = day + timedelta(days=offset)
+            if date.weekday() not in self.weekdays:
+                continue
+            for start, _ in sorted(self.sessions):
+                opens = datetime.combine(date, start, tzinfo=MARKET_TIMEZONE).timestamp()
+                if opens > timestamp:
+                    return opens
+        raise ValueError("No trading session within a week; check sessions and weekdays.")
+
+    # Returns the interval to wait after a tick at timestamp.
+    def interval_at(self, timestamp):
+        moment = datetime.fromtimestamp(timestamp, MARKET_TIMEZONE)
+        if _in_window(moment, self.busy_windows):
+            return self.min_interval
+        return self.interval
+
+    # Returns the timestamp of the next poll and advances the schedule to it.
+    def next_tick(self):
+        now = self.clock()
+        if self._next_tick is None:
+            tick = now
+        else:
+            interval = self.interval_at(self._next_tick)
+            tick = self._next_tick + interval
+            if tick < now:
+                missed = int((now - tick) // interval) + 1
+                self.skipped_ticks += missed
+                metrics.inc("screener_skipped_ticks_total", missed)
+                tick += missed * interval
+
+        opens = self.next_session_open(tick)
+        if opens != tick:
+            print(f"Market closed, next poll at {datetime.fromtimestamp(opens, MARKET_TIMEZONE):%Y-%m-%d %H:%M %Z}.")
+            tick = opens
+        self._next_tick = tick
+        return tick
+
+    # Blocks until the next poll is due.
+    def wait(self):
+        time.sleep(max(0, self.next_tick() - self.clock()))
+
+    async def wait_async(self):
+        import asyncio  # only the concurrent runners need it
+
+        await asyncio.sleep(max(0, self.next_tick() - self.clock()))
+
+    # Adjusts the interval after a poll that found hit_count hits, given the
+    # responseTime the screener reported for it.
+    def record_poll(self, hit_count, response_time=None):
+        self._recent_hits.append(hit_count)
+        timestamp = parse_response_time(response_time)
+        stale = timestamp is not None and timestamp == self._last_response_time
+        self._last_response_time = timestamp
+
+        if stale:
+            self.interval = min(self.max_interval, self.interval * RELAX_FACTOR)
+        elif hit_count:
+            self.interval = max(self.min_interval, self.interval * TIGHTEN_FACTOR)
+        elif len(self._recent_hits) == self._recent_hits.maxlen and not any(self._recent_hits):
+            self.interval = min(self.max_interval, self.interval * RELAX_FACTOR)
+            self._recent_hits.clear()
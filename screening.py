@@ -0,0 +1,201 @@
+import numpy as np
+
+from metrics import metrics
+from parsing import clean_float, parse_float_column, parse_int_column
+from records import OptionRecord
+
+
+# Option fields parsed to numbers for every active option. 'bid' is not used
+# by any filter, so it's only parsed for hits.
+FLOAT_FIELDS = ['trade.price', 'ask', 'strp']
+INT_FIELDS = ['trade.time', 'ooi', 'exp']
+
+
+STAGE_SECONDS = "screener_stage_seconds"
+REJECTIONS = "screener_filter_rejections_total"
+
+# Columns added by BaselineStore.update(), copied onto each OptionRecord.
+BASELINE_FIELDS = ('volume_zscore', 'acceleration', 'underlier_zscore', 'anomaly_score')
+
+# Raw 'ovol' values that parse to zero volume.
+NO_VOLUME = ('0', '', '--', 'NaN')
+
+
+# Yields (option, underlier) for every option in
+# ScreenData.underliers[*].options[*], reading one underlier at a time.
+#
+# With active_only, options with no volume are dropped as each underlier is
+# read, and the underliers yielded are copies without their 'options' list.
+# Nothing then keeps inactive options alive, so when underliers are streamed
+# in one at a time, they are freed as the stream is read.
+def iter_options(data, active_only=False):
+    received = 0
+    active = 0
+    for underlier in data.get("ScreenData", {}).get("underliers", []):
+        underlier_options = underlier.get("options", [])
+        received += len(underlier_options)
+        if active_only:
+            underlier_options = [opt for opt in underlier_options if opt['ovol'] not in NO_VOLUME]
+            underlier = {key: value for key, value in underlier.items() if key != "options"}
+        active += len(underlier_options)
+        for option in underlier_options:
+            yield option, underlier
+    metrics.inc("screener_options_total", received)
+    if active_only:
+        metrics.inc(REJECTIONS, received - active, rule="volume")
+
+
+# Returns every option iter_options() yields, and the underlier each one
+# belongs to, as two lists.
+def collect_options(data, active_only=False):
+    options = []
+    option_underliers = []
+    for option, underlier in iter_options(data, active_only):
+        options.append(option)
+        option_underliers.append(underlier)
+    return options, option_underliers
+
+
+# Flattens options into NumPy column arrays. Returns the columns dict plus the
+# option dicts and their underliers, in the same order as the rows of every
+# column.
+#
+# Options with no volume can never be hits, so 'ovol' is parsed first and the
+# remaining fields are only parsed for options with activity.
+def flatten_options(options, option_underliers):
+    # Filter out options in the returned chain with no activity.
+    volume = parse_int_column([opt['ovol'] for opt in options])
+    active = np.flatnonzero(volume)
+    if len(active) < len(options):
+        options = [options[i] for i in active]
+        option_underliers = [option_underliers[i] for i in active]
+        volume = volume[active]
+
+    underlying_prices = {}
+    for underlier in option_underliers:
+        if id(underlier) not in underlying_prices:
+            underlying_prices[id(underlier)] = clean_float(underlier.get("price"))
+
+    columns = {'ovol': volume}
+    for field in FLOAT_FIELDS:
+        columns[field] = parse_float_column([opt[field] for opt in options])
+    for field in INT_FIELDS:
+        columns[field] = parse_int_column([opt.get(field, 0) for opt in options])
+    columns['is_call'] = np.array([opt['otype'] == "CALL" for opt in options], dtype=bool)
+    columns['underlying_price'] = np.array(
+        [underlying_prices[id(und)] for und in option_underliers], dtype=np.float64
+    )
+
+    return columns, options, option_underliers
+
+
+# Flattens ScreenData.underliers[*].options[*] into NumPy column arrays.
+def flatten_screen_data(data):
+    return flatten_options(*collect_options(data))
+
+
+# Adds the metrics derived from the parsed fields to columns: total premium,
+# OTM percent and whether the trade looks like buying to open.
+def derive_columns(columns):
+    underlying_price = columns['underlying_price']
+
+    # Calculate total price paid for each position.
+    columns['total_premium'] = columns['trade.price'] * columns['ovol'] * 100
+
+    # How "out of the money" is this option?
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns['otm_percent'] = np.where(
+            columns['is_call'],
+            (columns['strp'] - underlying_price) / underlying_price,
+            (underlying_price - columns['strp']) / underlying_price,
+        )
+
+    trade_price_higher_than_ask = columns['trade.price'] >= columns['ask']
+    trade_volume_higher_than_oi = columns['ovol'] > columns['ooi']
+    columns['buy_to_open'] = trade_price_higher_than_ask | trade_volume_higher_than_oi
+
+
+# Builds the OptionRecord for row i of the columns.
+def make_record(columns, options, option_underliers, hq_mask, i):
+    option = options[i]
+    underlier = option_underliers[i]
+    return OptionRecord(
+        symbol=option['symbol'],
+        display_symbol=option['displaySymbol'],
+        underlying_symbol=underlier.get('symbol'),
+        is_call=bool(columns['is_call'][i]),
+        trade_price=float(columns['trade.price'][i]),
+        trade_time=int(columns['trade.time'][i]),
+        ovol=int(columns['ovol'][i]),
+        ooi=int(columns['ooi'][i]),
+        ask=float(columns['ask'][i]),
+        bid=clean_float(option.get('bid')),
+        strike=float(columns['strp'][i]),
+        exp=int(columns['exp'][i]),
+        underlying_price=float(columns['underlying_price'][i]),
+        underlying_price_text=underlier.get('price'),
+        total_premium=float(columns['total_premium'][i]),
+        otm_percent=float(columns['otm_percent'][i]),
+        buy_to_open=bool(columns['buy_to_open'][i]),
+        hq_hit=bool(hq_mask[i]),
+        **{field: float(columns[field][i]) for field in BASELINE_FIELDS if field in columns},
+    )
+
+
+# Runs rules (compiled Rules, see rules.py) over a ScreenData payload at once
+# and returns the list of hits as OptionRecords, skipping any option key
+# already in options_already_seen (a set or a DedupStore). With baselines (a
+# BaselineStore), every active option updates its rolling volume baseline,
+# and hits are scored and returned most anomalous first. With greeks (a
+# GreeksCalculator), hits get their implied volatility, delta and gamma.
+def screen_options(data, options_already_seen, rules, baselines=None, greeks=None):
+    options, option_underliers = collect_options(data, active_only=True)
+    return screen_option_list(options, option_underliers, options_already_seen, rules, baselines, greeks)
+
+
+# Same as screen_options(), for a list of options and their underliers, e.g.
+# only the ones that changed since the last poll.
+def screen_option_list(options, option_underliers, options_already_seen, rules, baselines=None, greeks=None):
+    with metrics.time(STAGE_SECONDS, stage="parse"):
+        rows = len(options)
+        columns, options, option_underliers = flatten_options(options, option_underliers)
+        metrics.inc(REJECTIONS, rows - len(options), rule="volume")
+    if not options:
+        return []
+
+    if baselines is not None:
+        with metrics.time(STAGE_SECONDS, stage="baselines"):
+            scores = baselines.update(columns, options, option_underliers)
+            columns.update(zip(BASELINE_FIELDS, scores))
+
+    with metrics.time(STAGE_SECONDS, stage="filter"):
+        derive_columns(columns)
+        candidates = rules.detection.evaluate(columns)
+    with metrics.time(STAGE_SECONDS, stage="high_quality"):
+        # Only hits need the flag, so only they are checked.
+        hq_mask = np.zeros(len(options), dtype=bool)
+        hq_mask[rules.high_quality.evaluate(columns, candidates)] = True
+
+    hits = []
+    with metrics.time(STAGE_SECONDS, stage="dedup"):
+        for i in candidates:
+            record = make_record(columns, options, option_underliers, hq_mask, i)
+
+            # Key the option trade so we don't get notifications for the same qualifying option multiple times.
+            key = record.key
+            if key in options_already_seen:
+                continue
+            options_already_seen.add(key)
+
+            hits.append(record)
+
+    if greeks is not None and hits:
+        with metrics.time(STAGE_SECONDS, stage="greeks"):
+            greeks.enrich(hits)
+    if baselines is not None:
+        hits.sort(key=lambda hit: hit.anomaly_score, reverse=True)
+    metrics.inc(REJECTIONS, len(candidates) - len(hits), rule="already_seen")
+    high_quality = sum(1 for hit in hits if hit.hq_hit)
+    metrics.inc("screener_hits_total", high_quality, high_quality="true")
+    metrics.inc("screener_hits_total", len(hits) - high_quality, high_quality="false")
+    return hits
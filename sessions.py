@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from requests.cookies import create_cookie, extract_cookies_to_jar
+
+from http_client import seed_cookies
+from metrics import metrics
+
+DEFAULT_KEEPALIVE_SECONDS = 10 * 60  # idle time before a keep-alive request
+CREDENTIALS_RECHECK_SECONDS = 30  # how often to look for new credentials after a 401
+
+
+# Identifies a cookie jar's cookies by name and value, e.g. the ones pasted in
+# a cURL string, so a saved jar is only reused for the credentials it grew from.
+def cookies_fingerprint(cookies):
+    items = sorted((cookie.name, cookie.value) for cookie in cookies)
+    return hashlib.sha1(json.dumps(items).encode(), usedforsecurity=False).hexdigest()
+
+
+# Returns the cookie jar path for one account of several, e.g. cookies.json ->
+# cookies-account-1.json, so worker processes never write the same file.
+def account_cookie_jar_path(path, account):
+    root, extension = os.path.splitext(path)
+    return f"{root}-account-{account}{extension}"
+
+
+def _cookie_to_dict(cookie):
+    return {
+        "name": cookie.name,
+        "value": cookie.value,
+        "domain": cookie.domain,
+        "path": cookie.path,
+        "expires": cookie.expires,
+        "secure": cookie.secure,
+    }
+
+
+# Keeps a requests session's cookies alive across polls and restarts.
+#
+# Every successful response's cookies are saved to path (only when they
+# changed), and a later run started from the same cURL cookies picks up the
+# saved jar instead, since ETRADE rotates session cookies as it is used and the
+# pasted ones go stale. A different cURL string starts afresh.
+#
+# With keepalive_seconds, a background thread calls keepalive(), which returns
+# a status code, whenever the session has gone that long without a successful
+# response, e.g. overnight while polling is suspended, so ETRADE doesn't
+# expire the session for inactivity.
+class SessionManager:
+    def __init__(self, session, path=None, keepalive=None, keepalive_seconds=DEFAULT_KEEPALIVE_SECONDS, clock=time.monotonic):
+        self.session = session
+        self.path = path
+        self.keepalive = keepalive
+        self.keepalive_seconds = keepalive_seconds
+        self.clock = clock
+        self.source = cookies_fingerprint(session.cookies)
+        self.last_active = clock()  # last successful response or keep-alive attempt
+        self._saved = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        session.hooks["response"].append(self._on_response)
+
+    # Replaces the session's cookies with the saved jar, if it grew from the
+    # cookies the session holds now. Returns whether it did.
+    def restore(self):
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading saved cookies from {self.path}: {e}")
+            return False
+        if saved.get("source") != self.source:
+            print("Saved cookies are from different credentials, using the cURL string's.")
+            return False
+
+        now = time.time()
+        cookies = [cookie for cookie in saved["cookies"] if cookie["expires"] is None or cookie["expires"] > now]
+        # Jars saved before pasted cookies were scoped to the host can hold a
+        # stale unscoped copy next to the refreshed cookie; keep the refreshed one.
+        scoped = {cookie["name"] for cookie in cookies if cookie["domain"]}
+        cookies = [cookie for cookie in cookies if cookie["domain"] or cookie["name"] not in scoped]
+        self.session.cookies.clear()
+        for cookie in cookies:
+            self.session.cookies.set_cookie(create_cookie(**cookie))
+        self._saved = cookies
+        print(f"Restored {len(cookies)} saved cookies from {self.path}.")
+        return True
+
+    # Replaces the session's cookies with new credentials for url, e.g. after
+    # a 401.
+    def reseed(self, cookies, url):
+        self.session.cookies.clear()
+        seed_cookies(self.session, cookies, url)
+        with self._lock:
+            self.source = cookies_fingerprint(self.session.cookies)
+            self._saved = None
+        self.save()
+
+    # Writes the session's cookies to path if they changed since last saved.
+    # The file is replaced atomically and readable only by its owner.
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            cookies = [_cookie_to_dict(cookie) for cookie in self.session.cookies]
+            if cookies == self._saved:
+                return
+            temporary_path = f"{self.path}.tmp"
+            with open(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+                json.dump({"source": self.source, "cookies": cookies}, f)
+            os.replace(temporary_path, self.path)
+            self._saved = cookies
+        metrics.inc("screener_cookie_jar_saves_total")
+
+    # Response hook for the session. Hooks run before requests copies the
+    # response's cookies into the session, so that is done here first.
+    def _on_response(self, response, **kwargs):
+        if response.status_code in (200, 304):
+            self.last_active = self.clock()
+            extract_cookies_to_jar(self.session.cookies, response.request, response.raw)
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Error saving cookies to {self.path}: {e}")
+        return response
+
+    def start(self):
+        if self._thread is None and self.keepalive is not None and self.keepalive_seconds:
+            self._thread = threading.Thread(target=self._run, name="keepalive", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(max(1, self.last_active + self.keepalive_seconds - self.clock())):
+            if self.clock() - self.last_active < self.keepalive_seconds:
+                continue
+            try:
+                status_code = self.keepalive()
+            except OSError as e:
+                print(f"Keep-alive request failed: {e}")
+                status_code = "error"
+            metrics.inc("screener_keepalives_total", status=status_code)
+            if status_code not in (200, 304):
+                print(f"Keep-alive request got {status_code}.")
+                # Try again after another interval rather than straight away.
+                self.last_active = self.clock()
@@ -0,0 +1,69 @@
+import json
+
+from urllib3.exceptions import HTTPError as _Urllib3Error
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+UNDERLIERS_PREFIX = "ScreenData.underliers"
+
+# Errors reading a streamed body as it is parsed, e.g. the connection dropping
+# or a chunked body cut short. They surface wherever the body is read from,
+# including while a streamed response's underliers are screened.
+READ_ERRORS = (OSError, _Urllib3Error)
+
+# Bytes read from the body at a time when streaming. ijson buffers the parse
+# events for a whole chunk, so smaller chunks mean a lower memory peak.
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+# Decodes a JSON response body, with orjson when it's installed. orjson parses
+# the bytes directly instead of decoding them to a str first.
+def loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _iter_underliers(events):
+    try:
+        yield from ijson.items(events, UNDERLIERS_PREFIX + ".item")
+    except ijson.JSONError as e:
+        # Keep the underliers that arrived intact rather than losing the poll.
+        print(f"Invalid JSON response, stopping after the underliers received so far: {e}")
+
+
+# Parses a screener response incrementally from a file-like object, e.g. a
+# streamed response's raw body. Everything before ScreenData.underliers is
+# parsed up front; the returned dict's ScreenData.underliers is a generator
+# that parses and yields one underlier (with its options) at a time, so the
+# body is never held in memory all at once. Requires ijson.
+def stream_screen_data(fileobj):
+    events = ijson.parse(fileobj, buf_size=STREAM_CHUNK_SIZE, use_float=True)
+    builder = ijson.ObjectBuilder()
+    try:
+        for prefix, event, value in events:
+            builder.event(event, value)
+            if prefix == "ScreenData" and event == "map_key" and value == "underliers":
+                builder.value["ScreenData"]["underliers"] = _iter_underliers(events)
+                break
+    except ijson.JSONError as e:
+        raise json.JSONDecodeError(str(e), "", 0) from e
+    return builder.value
+
+
+# Returns the decoded body of a screener response. With stream, the response
+# must have been fetched with stream=True; its body is parsed incrementally by
+# stream_screen_data() if ijson is installed.
+def read_response(response, stream=False):
+    if stream and ijson is not None:
+        response.raw.decode_content = True  # undo gzip/deflate transfer encoding
+        return stream_screen_data(response.raw)
+    return loads(response.content)
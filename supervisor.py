@@ -0,0 +1,230 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+
+from async_runner import run_screens, screen_name
+from dedup import DedupStore
+from diffing import ResponseFingerprint, ScreenDiffer
+from http_client import DEFAULT_TIMEOUT
+from metrics import metrics
+from sessions import CREDENTIALS_RECHECK_SECONDS, account_cookie_jar_path
+
+AUTH_REQUIRED_EXIT_CODE = 3
+MIN_RESTART_BACKOFF_SECONDS = 30
+MAX_RESTART_BACKOFF_SECONDS = 900
+STABLE_RUN_SECONDS = 600  # a worker up this long has its restart backoff reset
+
+
+# Assigns screens to accounts round-robin. screens is a list of
+# (parsed_curl_dict, interval_seconds) pairs and accounts a list of parsed curl
+# dicts, both as returned by parse_curl_string_to_dict(). Each screen keeps its
+# URL and query parameters but is sent with its account's headers and cookies.
+# Returns one list of screens per account. With no screens, every account
+# polls the screen in its own cURL string.
+def shard_screens(screens, accounts, interval_seconds):
+    if not screens:
+        return [[(account, interval_seconds)] for account in accounts]
+    shards = [[] for _ in accounts]
+    for index, (screen, screen_interval) in enumerate(screens):
+        account = accounts[index % len(accounts)]
+        sharded = dict(screen, headers=account["headers"], cookies=account["cookies"])
+        shards[index % len(accounts)].append((sharded, screen_interval))
+    return shards
+
+
+# Entry point of a worker process. Polls one account's screens on one event
+# loop like main_concurrent(), and puts ("hits", account, screen, hits) on
+# results for every poll with hits. hits are already deduplicated within this
+# worker; the supervisor deduplicates across workers. On a 401 it puts
+# ("auth", account, screen) on results, stops every screen and exits with
+# AUTH_REQUIRED_EXIT_CODE, since the account's cookies are shared by all of them.
+# The account's cookies are saved to its own file derived from cookie_jar_path.
+# make_differ() and make_fingerprint() return each screen's ScreenDiffer and
+# ResponseFingerprint.
+def run_worker(account, screens, results, find_hits, make_scheduler, incremental=True, timeout=DEFAULT_TIMEOUT, on_tick=None,
+               cookie_jar_path=None, keepalive_seconds=None, make_differ=ScreenDiffer, make_fingerprint=ResponseFingerprint):
+    options_already_seen = DedupStore()
+    differs = {}  # screen name -> ScreenDiffer
+    auth_required = False
+
+    def process_data(name, data):
+        if incremental and name not in differs:
+            differs[name] = make_differ()
+        hits = find_hits(data, options_already_seen, differs.get(name))
+        if hits:
+            results.put(("hits", account, name, hits))
+        return hits
+
+    async def poll():
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(run_screens(
+            screens,
+            process_data=process_data,
+            on_auth_required=lambda name: on_auth_required(loop, task, name),
+            timeout=timeout,
+            make_scheduler=make_scheduler,
+            make_fingerprint=make_fingerprint,
+            on_tick=on_tick,
+            cookie_jar_path=account_cookie_jar_path(cookie_jar_path, account) if cookie_jar_path else None,
+            keepalive_seconds=keepalive_seconds,
+        ))
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def on_auth_required(loop, task, name):
+        nonlocal auth_required
+        auth_required = True
+        results.put(("auth", account, name))
+        loop.call_soon_threadsafe(task.cancel)
+
+    asyncio.run(poll())
+    raise SystemExit(AUTH_REQUIRED_EXIT_CODE if auth_required else 1)
+
+
+class _Worker:
+    def __init__(self, account):
+        self.account = account
+        self.process = None
+        self.started_at = None
+        self.restart_at = 0
+        self.backoff = MIN_RESTART_BACKOFF_SECONDS
+        self.awaiting_credentials = None  # cookies that failed with a 401
+
+
+# Runs each account's share of the screens in its own worker process, so each
+# ETRADE session is rate limited separately and a crash or expired session only
+# stops that account's screens.
+#
+# Hits from every worker are merged into one stream: the supervisor drops any
+# already in options_already_seen (shared by all workers) and passes the rest
+# to handle_hits(hits, options_already_seen). A worker that exits is restarted
+# with exponential backoff. One that stopped on a 401 is reported through
+# on_auth_required(account, screen) and restarted once load_accounts() returns
+# new cookies for its account, e.g. after CURL_STRING is replaced in api_keys.py.
+# on_tick runs in each worker before every poll, see poll_screen(), and
+# cookie_jar_path and keepalive_seconds configure each worker's SessionManager.
+# make_differ and make_fingerprint are passed to run_worker().
+class Supervisor:
+    def __init__(self, accounts, screens, interval_seconds, find_hits, handle_hits, on_auth_required, make_scheduler,
+                 options_already_seen, load_accounts=None, incremental=True, timeout=DEFAULT_TIMEOUT, on_tick=None,
+                 cookie_jar_path=None, keepalive_seconds=None, make_differ=ScreenDiffer, make_fingerprint=ResponseFingerprint):
+        self.accounts = accounts
+        self.shards = shard_screens(screens, accounts, interval_seconds)
+        self.find_hits = find_hits
+        self.handle_hits = handle_hits
+        self.on_auth_required = on_auth_required
+        self.make_scheduler = make_scheduler
+        self.options_already_seen = options_already_seen
+        self.load_accounts = load_accounts
+        self.incremental = incremental
+        self.timeout = timeout
+        self.on_tick = on_tick
+        self.cookie_jar_path = cookie_jar_path
+        self.keepalive_seconds = keepalive_seconds
+        self.make_differ = make_differ
+        self.make_fingerprint = make_fingerprint
+        # spawn rather than fork: the parent runs the notifier and metrics threads.
+        self._context = multiprocessing.get_context("spawn")
+        self.results = self._context.Queue()
+        self.workers = [_Worker(account) for account in range(len(accounts))]
+        self._stopping = False
+
+    def _start_worker(self, worker):
+        screens = [
+            (dict(screen, headers=self.accounts[worker.account]["headers"], cookies=self.accounts[worker.account]["cookies"]), interval)
+            for screen, interval in self.shards[worker.account]
+        ]
+        worker.process = self._context.Process(
+            target=run_worker,
+            args=(worker.account, screens, self.results, self.find_hits, self.make_scheduler, self.incremental, self.timeout, self.on_tick,
+                  self.cookie_jar_path, self.keepalive_seconds, self.make_differ, self.make_fingerprint),
+            name=f"account-{worker.account}",
+            daemon=True,
+        )
+        worker.process.start()
+        worker.started_at = time.time()
+        names = ", ".join(screen_name(screen, index) for index, (screen, _) in enumerate(screens))
+        print(f"Started worker for account {worker.account} ({names}).")
+
+    # Starts workers that are due and notes the ones that have exited.
+    def _check_workers(self):
+        now = time.time()
+        for worker in self.workers:
+            if not self.shards[worker.account]:
+                continue
+            if worker.process is not None and not worker.process.is_alive():
+                exit_code = worker.process.exitcode
+                worker.process = None
+                metrics.inc("screener_worker_restarts_total", account=worker.account)
+                if now - worker.started_at >= STABLE_RUN_SECONDS:
+                    worker.backoff = MIN_RESTART_BACKOFF_SECONDS
+                if exit_code == AUTH_REQUIRED_EXIT_CODE:
+                    worker.awaiting_credentials = self.accounts[worker.account]["cookies"]
+                    worker.restart_at = now
+                    print(f"Worker for account {worker.account} needs re-authentication.")
+                else:
+                    worker.restart_at = now + worker.backoff
+                    print(f"Worker for account {worker.account} exited with code {exit_code}, restarting in {worker.backoff}s.")
+                    worker.backoff = min(worker.backoff * 2, MAX_RESTART_BACKOFF_SECONDS)
+
+            if worker.process is None and now >= worker.restart_at:
+                if worker.awaiting_credentials is not None:
+                    if not self._credentials_refreshed(worker):
+                        worker.restart_at = now + CREDENTIALS_RECHECK_SECONDS
+                        continue
+                    worker.awaiting_credentials = None
+                self._start_worker(worker)
+
+    def _credentials_refreshed(self, worker):
+        if self.load_accounts is None:
+            return False
+        try:
+            accounts = self.load_accounts()
+        except Exception as e:
+            print(f"Error reloading credentials: {e}")
+            return False
+        if worker.account >= len(accounts) or accounts[worker.account]["cookies"] == worker.awaiting_credentials:
+            return False
+        self.accounts[worker.account] = accounts[worker.account]
+        return True
+
+    def _handle_result(self, result):
+        if result[0] == "auth":
+            _, account, name = result
+            self.on_auth_required(account, name)
+            return
+
+        _, account, name, hits = result
+        new_hits = []
+        for hit in hits:
+            key = hit.key
+            if key in self.options_already_seen:
+                continue
+            self.options_already_seen.add(key)
+            new_hits.append(hit)
+        metrics.inc("screener_filter_rejections_total", len(hits) - len(new_hits), rule="seen_by_other_worker")
+        if new_hits:
+            print(f"{len(new_hits)} new hits from account {account}, {name}.")
+            self.handle_hits(new_hits, self.options_already_seen)
+
+    # Runs until stop() is called or the process is interrupted.
+    def run(self):
+        try:
+            while not self._stopping:
+                self._check_workers()
+                try:
+                    self._handle_result(self.results.get(timeout=1))
+                except queue.Empty:
+                    pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopping = True
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(5)
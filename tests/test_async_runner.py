@@ -0,0 +1,50 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from async_runner import poll_screen
+from http_client import LatencyStats
+
+
+class FakeClient:
+    def __init__(self):
+        self.stats = LatencyStats()
+        self.fetches = 0
+
+    def fetch(self):
+        self.fetches += 1
+        return SimpleNamespace(status_code=200, content=f'{{"responseTime": "{self.fetches}", "poll": {self.fetches}}}'.encode())
+
+
+# Lets the given number of polls through, then cancels the screen.
+class FakeScheduler:
+    def __init__(self, polls):
+        self.polls = polls
+
+    async def wait_async(self):
+        if self.polls == 0:
+            raise asyncio.CancelledError
+        self.polls -= 1
+
+    def record_poll(self, hit_count, response_time=None):
+        pass
+
+
+def test_an_error_in_one_poll_only_skips_that_poll():
+    processed = []
+
+    def process_data(name, data):
+        processed.append(data["responseTime"])
+        if len(processed) == 1:
+            raise ValueError("bad response")
+        return []
+
+    async def run():
+        with ThreadPoolExecutor(1) as executor:
+            await poll_screen("screen", FakeClient(), FakeScheduler(3), executor, executor, process_data, on_auth_required=None)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run())
+    assert processed == ["1", "2", "3"]
@@ -0,0 +1,86 @@
+import re
+
+import pytest
+
+from curl_parser import parse_curl, split_command, split_curl_file
+
+URL = "https://us.etrade.com/e/t/screener"
+
+
+@pytest.mark.parametrize("command, words", [
+    ("curl 'a b' \"c d\"", ["curl", "a b", "c d"]),
+    ("curl 'it'\\''s'", ["curl", "it's"]),
+    ("curl $'it\\'s\\n\\t\\x41\\u00e9\\101'", ["curl", "it's\n\tAéA"]),
+    ("curl \"a\\\"b\\$c\\d\"", ["curl", 'a"b$c\\d']),
+    ("curl a\\\n  b", ["curl", "a", "b"]),
+    ("curl ^\"a^&b^\" ^\n  ^\"^{^\\^\"k^\\^\":1^}^\"", ["curl", "a&b", '{"k":1}']),
+    ("curl ''", ["curl", ""]),
+])
+def test_split_command(command, words):
+    assert split_command(command) == words
+
+
+@pytest.mark.parametrize("command, expected", [
+    # Chrome's bash variant, with a $'...' body.
+    (
+        f"curl '{URL}?screenid=1' -H 'accept: */*' -b 'SMSESSION=a=b; JSESSIONID=x' --data-raw $'{{\"q\":\"it\\'s\"}}' --compressed",
+        {"method": "POST", "headers": {"accept": "*/*"}, "cookies": {"SMSESSION": "a=b", "JSESSIONID": "x"},
+         "query_params": {"screenid": "1"}, "data": '{"q":"it\'s"}'},
+    ),
+    # Chrome's cmd variant, escaped with carets.
+    (
+        f"curl ^\"{URL}?screenid=9^&y=^%^7E^\" ^\n  -H ^\"accept: */*^\" ^\n  -b ^\"k=v^\" ^\n  --compressed",
+        {"method": "GET", "headers": {"accept": "*/*"}, "cookies": {"k": "v"}, "query_params": {"screenid": "9", "y": "~"}, "data": None},
+    ),
+    # Firefox: explicit method, Cookie header and headers the client manages itself.
+    (
+        f"curl '{URL}' -X POST -H 'Cookie: a=1; b=2' -H 'Accept-Encoding: gzip' -H 'If-None-Match: \"x\"' --data-raw 'x=1'",
+        {"method": "POST", "headers": {}, "cookies": {"a": "1", "b": "2"}, "query_params": {}, "data": "x=1"},
+    ),
+    # A short option glued to its value, and --url=.
+    (
+        f"curl -XPUT --url={URL} -k",
+        {"method": "PUT", "headers": {}, "cookies": {}, "query_params": {}, "data": None},
+    ),
+    # -G moves the data into the query string.
+    (
+        f"curl -G '{URL}?screenid=2' -d a=1 --data 'b=x%20y'",
+        {"method": "GET", "headers": {}, "cookies": {}, "query_params": {"screenid": "2", "a": "1", "b": "x y"}, "data": None},
+    ),
+    # Repeated parameters become lists, and several -d are joined with &.
+    (
+        f"curl '{URL}?x=1&x=2&x=3&y=' -d a=1 -d a=2",
+        {"method": "POST", "headers": {}, "cookies": {}, "query_params": {"x": ["1", "2", "3"], "y": ""}, "data": "a=1&a=2"},
+    ),
+    # "Name;" sends an empty header; "Name:" and a header without either aren't sent.
+    (
+        f"curl '{URL}' -H 'X-Empty;' -H 'X-Removed:' -H 'X-Bare' -H 'X-Value: a;b'",
+        {"method": "GET", "headers": {"X-Empty": "", "X-Value": "a;b"}, "cookies": {}, "query_params": {}, "data": None},
+    ),
+    # -A and -e set headers.
+    (
+        f"curl '{URL}' -A 'Mozilla/5.0' -e https://us.etrade.com/",
+        {"method": "GET", "headers": {"User-Agent": "Mozilla/5.0", "Referer": "https://us.etrade.com/"}, "cookies": {},
+         "query_params": {}, "data": None},
+    ),
+])
+def test_parse_curl(command, expected):
+    assert parse_curl(command) == dict(expected, url=URL)
+
+
+@pytest.mark.parametrize("command, message", [
+    ("wget https://h.com", "should start with 'curl'"),
+    ("curl -H", "missing its value"),
+    ("curl -k", "no URL"),
+    ("curl ftp://h.com/f", "isn't an http(s) URL"),
+    ("curl 'https://h.com", "Unterminated ' quote"),
+    ("curl $'https://h.com", "Unterminated $' quote"),
+])
+def test_parse_curl_rejects(command, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse_curl(command)
+
+
+def test_split_curl_file():
+    text = "# screen one\ncurl 'https://h.com/a' \\\n  -H 'a: b'\n\n# screen two\ncurl https://h.com/b\n"
+    assert split_curl_file(text) == ["curl 'https://h.com/a' \\\n  -H 'a: b'\n\n", "curl https://h.com/b\n"]
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from dedup import MARKET_TIMEZONE, DedupStore, option_key
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_option_key_is_stable():
+    assert option_key("A", "0.50", "09:31") == option_key("A", "0.50", "09:31")
+    assert option_key("A", "0.50", "09:31") != option_key("A", "0.50", "09:32")
+    assert option_key("A", "0.50", "09:31").bit_length() <= 64
+
+
+def test_keys_expire_after_the_ttl():
+    clock = FakeClock(1_000_000.0)
+    store = DedupStore(ttl_seconds=60, clock=clock)
+    store.add(1)
+    clock.now += 30
+    store.add(2)
+    clock.now += 29
+    assert 1 in store and 2 in store
+
+    clock.now += 1  # 60s after 1 was added
+    assert 1 not in store
+    assert 2 in store
+    clock.now += 30
+    assert 2 not in store
+    assert (len(store), store.expired) == (0, 2)
+
+
+def test_adding_a_key_again_refreshes_it():
+    clock = FakeClock(1_000_000.0)
+    store = DedupStore(ttl_seconds=60, clock=clock)
+    store.add(1)
+    clock.now += 50
+    store.add(1)
+    clock.now += 50
+    assert 1 in store
+
+
+def test_daily_reset_at_midnight_new_york_time():
+    clock = FakeClock(datetime(2025, 4, 16, 23, 59, tzinfo=MARKET_TIMEZONE).timestamp())
+    store = DedupStore(ttl_seconds=None, reset_daily=True, clock=clock)
+    store.add(1)
+    clock.now += 30
+    assert 1 in store
+    clock.now += 60  # 00:00:30 on the 17th
+    assert 1 not in store
+    assert store.expired == 1
+
+
+def test_no_daily_reset_by_default():
+    clock = FakeClock(datetime(2025, 4, 16, 23, 59, tzinfo=MARKET_TIMEZONE).timestamp())
+    store = DedupStore(ttl_seconds=None, clock=clock)
+    store.add(1)
+    clock.now += 120
+    assert 1 in store
+
+
+def test_least_recently_added_key_is_evicted():
+    store = DedupStore(max_keys=2)
+    for key in (1, 2, 1, 3):
+        store.add(key)
+    assert 1 in store and 3 in store
+    assert 2 not in store
+    assert store.evicted == 1
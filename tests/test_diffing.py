@@ -0,0 +1,52 @@
+from diffing import ResponseFingerprint, ScreenDiffer
+
+
+def option(symbol, ovol="100", trade_time="09:31:00"):
+    return {"symbol": symbol, "ovol": ovol, "trade.time": trade_time, "trade.price": "0.50", "ask": "0.55", "ooi": "10", "exp": "10"}
+
+
+def screen(*options):
+    return {"ScreenData": {"underliers": [{"symbol": "X", "price": "10.00", "options": list(options)}]}}
+
+
+def symbols(pairs):
+    return [option["symbol"] for option, _ in pairs]
+
+
+def test_diff_tracks_options_between_polls():
+    differ = ScreenDiffer()
+    delta = differ.diff(screen(option("A"), option("B"), option("C", ovol="0")))
+    assert (symbols(delta.new), delta.changed, delta.disappeared, delta.unchanged) == (["A", "B"], [], [], 0)
+
+    delta = differ.diff(screen(option("A"), option("B", trade_time="09:32:00"), option("D")))
+    assert symbols(delta.new) == ["D"]
+    assert symbols(delta.changed) == ["B"]
+    assert (delta.disappeared, delta.unchanged) == ([], 1)
+
+    delta = differ.diff(screen(option("B", trade_time="09:32:00")))
+    assert (delta.new, delta.changed, delta.unchanged) == ([], [], 1)
+    assert sorted(delta.disappeared) == ["A", "D"]
+
+
+def test_options_to_screen_keep_their_underlier():
+    delta = ScreenDiffer().diff(screen(option("A")))
+    options, underliers = delta.options_to_screen()
+    assert symbols(zip(options, underliers)) == ["A"]
+    assert underliers == [{"symbol": "X", "price": "10.00"}]
+
+
+def test_reset_makes_every_option_new():
+    differ = ScreenDiffer()
+    differ.diff(screen(option("A")))
+    differ.reset()
+    delta = differ.diff(screen(option("A")))
+    assert (symbols(delta.new), delta.unchanged) == (["A"], 0)
+
+
+def test_fingerprint_ignores_response_time():
+    fingerprint = ResponseFingerprint()
+    assert not fingerprint.unchanged(b'{"responseTime": "1", "ScreenData": {}}')
+    assert fingerprint.unchanged(b'{"responseTime": "2", "ScreenData": {}}')
+    assert not fingerprint.unchanged(b'{"responseTime": "2", "ScreenData": {"x": 1}}')
+    fingerprint.reset()
+    assert not fingerprint.unchanged(b'{"responseTime": "2", "ScreenData": {"x": 1}}')
@@ -0,0 +1,40 @@
+from greeks import GreeksCalculator
+from records import OptionRecord
+
+
+def record(symbol, trade_price=0.5, strike=10.0, exp=10):
+    return OptionRecord(
+        symbol=symbol, display_symbol=symbol, underlying_symbol="X", is_call=True, trade_price=trade_price,
+        trade_time=0, ovol=100, ooi=10, ask=0.55, bid=0.45, strike=strike, exp=exp, underlying_price=10.0,
+        underlying_price_text="10.00", total_premium=5000.0, otm_percent=0.0, buy_to_open=True, hq_hit=False,
+    )
+
+
+def test_small_cache_keeps_the_results_a_poll_needs():
+    greeks = GreeksCalculator(cache_size=2)
+    greeks.enrich([record("A")])
+    greeks.enrich([record("B")])
+    records = [record("A"), record("C")]
+    greeks.enrich(records)  # C evicts the least recently used entry, B
+
+    assert all(r.implied_volatility is not None and r.delta is not None for r in records)
+    assert set(key[0] for key in greeks.cache) == {"A", "C"}
+
+
+def test_more_options_than_the_cache_holds():
+    greeks = GreeksCalculator(cache_size=2)
+    records = [record(symbol) for symbol in "ABCDE"]
+    greeks.enrich(records)
+
+    assert all(r.implied_volatility is not None for r in records)
+    assert len(greeks.cache) == 2
+
+
+def test_cache_hits_are_reused():
+    greeks = GreeksCalculator()
+    first, second = record("A"), record("A")
+    greeks.enrich([first])
+    greeks.enrich([second])
+
+    assert (greeks.hits, greeks.misses) == (1, 1)
+    assert (second.implied_volatility, second.delta, second.gamma) == (first.implied_volatility, first.delta, first.gamma)
@@ -0,0 +1,97 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import ScreenerClient
+from streaming import READ_ERRORS, ijson, read_response
+
+
+# Serves {} and rotates the "sess" cookie on every request, recording the
+# Cookie header each request was sent with.
+@pytest.fixture
+def server():
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            received.append(self.headers.get("Cookie"))
+            self.send_response(200)
+            self.send_header("Set-Cookie", f"sess=NEW{len(received)}; Path=/")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}/screen", received
+    httpd.shutdown()
+
+
+def test_set_cookie_replaces_pasted_cookie(server):
+    url, received = server
+    client = ScreenerClient(url, {}, {"sess": "OLD", "other": "1"}, {})
+    client.fetch()
+    client.fetch()
+    assert sorted(received[0].split("; ")) == ["other=1", "sess=OLD"]
+    assert sorted(received[1].split("; ")) == ["other=1", "sess=NEW1"]
+    assert [cookie.value for cookie in client.session.cookies if cookie.name == "sess"] == ["NEW2"]
+
+
+def test_set_cookie_replaces_cookie_from_another_domain(server):
+    url, received = server
+    client = ScreenerClient(url, {}, {}, {})
+    # e.g. a cookie stored before the host scoped its own, or for a parent domain.
+    client.session.cookies.set("sess", "OLD", domain="")
+    client.fetch()
+    client.fetch()
+    assert received[1] == "sess=NEW1"
+
+
+TRUNCATED_BODY = b'{"responseTime": "t", "ScreenData": {"underliers": [{"symbol": "A", "options": []}, {"symbol": "B", "opt'
+
+
+# Answers every request with a 200 whose chunked body stops part way through
+# its only chunk, then closes the connection. Counts the requests.
+@pytest.fixture
+def truncated_server():
+    requests_received = []
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def serve():
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                return
+            with connection:
+                connection.recv(65536)
+                requests_received.append(1)
+                connection.sendall(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nTransfer-Encoding: chunked\r\n\r\n"
+                    b"400\r\n" + TRUNCATED_BODY
+                )
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield f"http://127.0.0.1:{listener.getsockname()[1]}/screen", requests_received
+    listener.close()
+
+
+def test_truncated_body_is_retried_then_skipped(truncated_server):
+    url, requests_received = truncated_server
+    client = ScreenerClient(url, {}, {}, {}, max_attempts=2, sleep=lambda delay: None)
+    assert client.fetch() is None
+    assert len(requests_received) == 2
+
+
+@pytest.mark.skipif(ijson is None, reason="streaming needs ijson")
+def test_truncated_streamed_body_raises_a_read_error(truncated_server):
+    url, _ = truncated_server
+    response = ScreenerClient(url, {}, {}, {}).fetch(stream=True)
+    with pytest.raises(READ_ERRORS):
+        data = read_response(response, stream=True)
+        list(data["ScreenData"]["underliers"])
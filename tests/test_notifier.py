@@ -0,0 +1,67 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from aggregation import HitAggregator
+from metrics import Metrics
+from notifier import NotificationDispatcher
+
+
+def hit(underlier, strike):
+    return SimpleNamespace(underlying_symbol=underlier, is_call=True, exp=10, strike=strike, total_premium=1000.0, ovol=10,
+                           hq_hit=False, anomaly_score=0.0)
+
+
+def test_zero_window_flushes_a_batch_at_once():
+    aggregator = HitAggregator(window_seconds=0)
+    aggregator.add([hit("A", 10), hit("A", 11), hit("B", 5)])
+    clusters = aggregator.flush()
+    assert sorted((cluster.underlying_symbol, len(cluster.hits)) for cluster in clusters) == [("A", 2), ("B", 1)]
+    assert len(aggregator) == 0
+
+
+def test_window_holds_clusters_until_it_closes():
+    now = [0.0]
+    aggregator = HitAggregator(window_seconds=30, clock=lambda: now[0])
+    aggregator.add([hit("A", 10)])
+    now[0] = 10
+    aggregator.add([hit("A", 11)])
+    assert aggregator.flush() == []
+    now[0] = 30
+    assert [len(cluster.hits) for cluster in aggregator.flush()] == [2]
+
+
+def test_dispatcher_sends_a_polls_sweep_without_waiting():
+    sent = []
+    done = threading.Event()
+
+    def send(msg):
+        sent.append(msg)
+        done.set()
+        return SimpleNamespace(status_code=200)
+
+    dispatcher = NotificationDispatcher(
+        send, format_hit=lambda h: f"hit {h.underlying_symbol}", coalesce_seconds=0,
+        aggregator=HitAggregator(window_seconds=0), format_cluster=lambda c: f"sweep {c.underlying_symbol} x{len(c.hits)}",
+    )
+    dispatcher.start()
+    start = time.monotonic()
+    dispatcher.submit([hit("A", 10), hit("A", 11)])
+    assert done.wait(5)
+    dispatcher.stop(timeout=5)
+    assert time.monotonic() - start < 5
+    assert sent == ["sweep A x2"]
+
+
+def test_queue_depth_and_send_latency_are_exported(monkeypatch):
+    registry = Metrics()
+    monkeypatch.setattr("notifier.metrics", registry)
+    dispatcher = NotificationDispatcher(lambda msg: SimpleNamespace(status_code=200), format_hit=str, queue_size=2)
+    registry.add_collector(dispatcher.samples, kind="gauge")
+    dispatcher.submit([hit("A", 10), hit("A", 11), hit("A", 12)])
+    dispatcher._send_with_backoff("msg")
+
+    rendered = registry.render()
+    assert "# TYPE screener_notification_queue_depth gauge\nscreener_notification_queue_depth 2\n" in rendered
+    assert "screener_notifications_dropped_total 1\n" in rendered
+    assert 'screener_notification_send_seconds_count{outcome="sent"} 1\n' in rendered
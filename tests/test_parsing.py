@@ -0,0 +1,67 @@
+import random
+import re
+
+import pytest
+
+from parsing import clean_float, clean_int, parse_float_column, parse_int_column
+
+# Characters ETRADE's numeric strings are built from, plus the kinds of noise
+# the regex parsers were written to tolerate: separators, currency and percent
+# signs, letters, whitespace and non-ASCII digits and spaces.
+ALPHABET = "0123456789" * 4 + ",.-" * 3 + " $%+eENa\t\n" + " ٣²"
+SPECIAL_VALUES = ["", "--", "NaN", " -- ", ".", "-", "1.2.3", "1,234.50", "-0.5", "15,723,554,319.00"]
+
+
+# The regex-based parsers parsing.py replaced, kept as the reference.
+def regex_clean_int(val):
+    val = str(val).strip()
+    if not val or val in ['--', 'NaN']:
+        return 0
+    try:
+        return int(re.sub(r'[^\d]', '', val))
+    except ValueError:
+        return 0
+
+
+def regex_clean_float(val):
+    val = str(val).strip()
+    if not val or val in ['--', 'NaN']:
+        return 0.0
+    try:
+        return float(re.sub(r'[^\d.\-]', '', val))
+    except ValueError:
+        return 0.0
+
+
+def random_value(rng):
+    kind = rng.random()
+    if kind < 0.1:
+        return rng.choice(SPECIAL_VALUES)
+    if kind < 0.2:
+        return rng.choice([rng.randint(-10**6, 10**6), round(rng.uniform(-1000, 1000), rng.randint(0, 4))])
+    # Kept under 16 characters, so every value fits an int64 column.
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 15)))
+
+
+def same_float(a, b):
+    return a == b or (a != a and b != b)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_clean_matches_regex(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        value = random_value(rng)
+        assert clean_int(value) == regex_clean_int(value), repr(value)
+        assert same_float(clean_float(value), regex_clean_float(value)), repr(value)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_parse_column_matches_regex(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        values = [random_value(rng) for _ in range(rng.randint(0, 40))]
+        assert parse_int_column(values).tolist() == [regex_clean_int(value) for value in values], values
+        floats = parse_float_column(values).tolist()
+        expected = [regex_clean_float(value) for value in values]
+        assert all(same_float(a, b) for a, b in zip(floats, expected)) and len(floats) == len(expected), values
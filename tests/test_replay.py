@@ -0,0 +1,24 @@
+import json
+
+from example_responses import example_response_1
+from recorder import ResponseRecorder
+from replay import load_bodies, replay
+from rules import Rules, default_rules_config
+
+
+def test_replays_only_the_recorded_200s(tmp_path):
+    body = json.dumps(example_response_1).encode()
+    recorder = ResponseRecorder(str(tmp_path))
+    recorder.start()
+    recorder.record(body, 1.0, 0.1, 200)
+    recorder.record(b"", 2.0, 0.1, 304)
+    recorder.record(b"<html>Unauthorized</html>", 3.0, 0.1, 401)
+    recorder.record(b"<html>Bad Gateway</html>", 4.0, 0.1, 502)
+    recorder.record(body, 5.0, 0.1, 200)
+    recorder.stop(timeout=10)
+
+    bodies = load_bodies([str(tmp_path)])
+    assert bodies == [body, body]
+
+    _, _, options = replay(bodies, 1, Rules.from_config(default_rules_config()), str, incremental=True)
+    assert options == 2 * sum(len(underlier["options"]) for underlier in example_response_1["ScreenData"]["underliers"])
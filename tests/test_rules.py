@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from rules import TUNE_EVERY_EVALUATIONS, Rule, Rules, RuleSet, default_rules_config
+
+
+def columns(**fields):
+    values = {
+        'ovol': [100.0], 'ooi': [50.0], 'trade.price': [0.50], 'trade.time': [0.0], 'ask': [0.50], 'strp': [10.0],
+        'exp': [10.0], 'is_call': [True], 'underlying_price': [10.0], 'total_premium': [5000.0], 'otm_percent': [0.0],
+        'buy_to_open': [True],
+    }
+    values.update(fields)
+    return {field: np.array(column) for field, column in values.items()}
+
+
+def is_high_quality(**fields):
+    return len(Rules.from_config(default_rules_config()).high_quality.evaluate(columns(**fields))) == 1
+
+
+def test_high_quality_requires_every_condition():
+    assert is_high_quality()
+    # The original filter read `oi_ratio >= 1.5 if oi_ratio else True and ...`,
+    # which skipped every other condition whenever there was open interest.
+    # An expensive, far out of the money option only filled at the bid no
+    # longer passes on its oi_ratio alone.
+    assert not is_high_quality(**{'trade.price': [5.0], 'ask': [10.0], 'otm_percent': [0.5]})
+    assert not is_high_quality(ooi=[100.0])  # oi_ratio 1
+    assert not is_high_quality(total_premium=[1000.0])
+
+
+def test_zero_oi_ratio_passes():
+    assert is_high_quality(ooi=[0.0])
+    rule_set = RuleSet([Rule("oi_ratio", "oi_ratio", ">=", 1.5)])
+    assert not len(rule_set.evaluate(columns(ooi=[0.0])))
+
+
+def test_missing_ask_counts_as_filled():
+    assert is_high_quality(ask=[0.0])
+    assert not is_high_quality(ask=[1.0])
+
+
+def test_evaluate_returns_rows_passing_every_rule():
+    rule_set = RuleSet([Rule("volume", "ovol", ">", 10), Rule("days_to_exp", "exp", "<=", 40)])
+    data = columns(ovol=[5.0, 50.0, 50.0, 500.0], exp=[1.0, 1.0, 90.0, 40.0])
+    assert rule_set.evaluate(data).tolist() == [1, 3]
+    assert rule_set.evaluate(data, np.array([0, 1, 2])).tolist() == [1]
+
+
+def test_rules_start_cheapest_first_and_are_tuned_by_selectivity():
+    derived = Rule("oi_ratio", "oi_ratio", ">=", 1.5)
+    permissive = Rule("days_to_exp", "exp", "<=", 40)
+    rule_set = RuleSet([derived, permissive])
+    assert rule_set.rules == [permissive, derived]
+
+    # Every option passes days_to_exp and almost none pass oi_ratio, so
+    # oi_ratio removes the most options for its cost and is moved first.
+    data = columns(ovol=[1.0] * 99 + [300.0], ooi=[100.0] * 100, exp=[10.0] * 100)
+    for _ in range(TUNE_EVERY_EVALUATIONS - 1):
+        rule_set.evaluate(data)
+    assert rule_set.rules == [permissive, derived]
+    rule_set.evaluate(data)
+    assert rule_set.rules == [derived, permissive]
+    assert derived.pass_rate == pytest.approx(0.01)
+    assert permissive.pass_rate == 1.0
+
+
+def test_reorder_off_keeps_the_initial_order():
+    derived = Rule("oi_ratio", "oi_ratio", ">=", 1.5)
+    permissive = Rule("days_to_exp", "exp", "<=", 40)
+    rule_set = RuleSet([derived, permissive], reorder=False)
+    data = columns(ovol=[1.0] * 100, ooi=[100.0] * 100, exp=[10.0] * 100)
+    for _ in range(TUNE_EVERY_EVALUATIONS):
+        rule_set.evaluate(data)
+    assert rule_set.rules == [permissive, derived]
+
+
+@pytest.mark.parametrize("entry, message", [
+    ({"name": "x", "field": "nope", "op": ">", "value": 1}, "unknown field"),
+    ({"name": "x", "field": "ovol", "op": "=>", "value": 1}, "unknown operator"),
+    ({"name": "x", "field": "ovol", "op": ">"}, "missing value"),
+])
+def test_invalid_rules_are_rejected(entry, message):
+    with pytest.raises(ValueError, match=message):
+        RuleSet.from_config([entry])
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pytest
+
+from dedup import MARKET_TIMEZONE
+from scheduler import PollScheduler, parse_response_time
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def market_time(day, hour, minute=0, second=0):
+    return datetime(2025, 4, day, hour, minute, second, tzinfo=MARKET_TIMEZONE).timestamp()
+
+
+# Wednesday 16 April 2025, outside the opening and closing busy windows.
+MIDDAY = market_time(16, 12)
+
+
+def test_ticks_are_fixed_rate():
+    clock = FakeClock(MIDDAY)
+    scheduler = PollScheduler(10, clock=clock)
+    assert scheduler.next_tick() == MIDDAY
+    clock.now += 3  # the poll took 3s
+    assert scheduler.next_tick() == MIDDAY + 10
+    clock.now = MIDDAY + 10
+    assert scheduler.next_tick() == MIDDAY + 20
+    assert scheduler.skipped_ticks == 0
+
+
+def test_overrun_ticks_are_skipped():
+    clock = FakeClock(MIDDAY)
+    scheduler = PollScheduler(10, clock=clock)
+    scheduler.next_tick()
+    clock.now += 25  # the poll overran the ticks at +10 and +20
+    assert scheduler.next_tick() == MIDDAY + 30
+    assert scheduler.skipped_ticks == 2
+
+
+def test_busy_windows_use_the_minimum_interval():
+    opening = market_time(16, 9, 35)
+    scheduler = PollScheduler(10, min_interval_seconds=2, clock=FakeClock(opening))
+    scheduler.next_tick()
+    assert scheduler.next_tick() == opening + 2
+
+
+@pytest.mark.parametrize("now, opens", [
+    (market_time(16, 8), market_time(16, 9, 30)),  # before the open
+    (market_time(16, 16), market_time(17, 9, 30)),  # after the close
+    (market_time(18, 17), market_time(21, 9, 30)),  # Friday evening, opens Monday
+])
+def test_closed_market_waits_for_the_next_session(now, opens):
+    scheduler = PollScheduler(10, clock=FakeClock(now))
+    assert scheduler.next_tick() == opens
+
+
+def test_tick_past_the_close_moves_to_the_next_session():
+    clock = FakeClock(market_time(16, 15, 59, 55))
+    scheduler = PollScheduler(10, clock=clock)
+    scheduler.next_tick()
+    assert scheduler.next_tick() == market_time(17, 9, 30)
+
+
+def test_no_sessions_polls_around_the_clock():
+    night = market_time(19, 3)  # Saturday
+    scheduler = PollScheduler(10, sessions=None, clock=FakeClock(night))
+    assert scheduler.next_tick() == night
+
+
+def test_interval_adapts_to_hits_and_stale_responses():
+    scheduler = PollScheduler(10, min_interval_seconds=5, max_interval_seconds=30)
+    scheduler.record_poll(3)
+    assert scheduler.interval == 5
+    scheduler.record_poll(0, "April 16, 2025 12:00:00 PM EDT")
+    scheduler.record_poll(0, "April 16, 2025 12:00:00 PM EDT")  # the screener hasn't refreshed
+    assert scheduler.interval == 7.5
+
+
+def test_parse_response_time():
+    assert parse_response_time("April 16, 2025 15:03:28 PM EDT") == market_time(16, 15, 3, 28)
+    assert parse_response_time("not a time") is None
+    assert parse_response_time(None) is None